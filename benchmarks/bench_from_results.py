@@ -0,0 +1,60 @@
+"""ResultBook.from_resultsのベンチマーク
+
+ループで組み立てていた以前の実装と, 縦持ちからpivotする現在の実装を比較する
+
+    python benchmarks/bench_from_results.py --games 200000 --players 1000
+"""
+import argparse
+import time
+from typing import List
+
+import pandas as pd
+from corpus import synthetic_results
+
+from tenhoulog.models import GameResult, ResultBook
+
+
+def legacy_from_results(results: List[GameResult], player_names: List[str]) -> ResultBook:
+    """以前のfrom_resultsの実装"""
+    scores = []
+    ranks = []
+    tips = []
+    columns = player_names + ["starttime"]
+    players = set(player_names)
+    for result in results:
+        if not (players & set(result.player_names())):
+            continue
+        records = result.to_records()
+        scores.append(dict({record.player_name: record.point for record in records}, starttime=result.starttime))
+        ranks.append(dict({record.player_name: record.rank for record in records}, starttime=result.starttime))
+        tips.append(dict({record.player_name: record.tip for record in records}, starttime=result.starttime))
+    return ResultBook(
+        pd.DataFrame(scores, columns=columns),
+        pd.DataFrame(ranks, columns=columns),
+        pd.DataFrame(tips, columns=columns),
+    )
+
+
+def timeit(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=50000)
+    parser.add_argument("--players", type=int, default=500)
+    args = parser.parse_args()
+
+    results = synthetic_results(args.games, args.players)
+    player_names = [f"player{i}" for i in range(args.players)]
+    legacy = timeit(legacy_from_results, results, player_names)
+    current = timeit(ResultBook.from_results, results, player_names)
+    print(f"games={args.games} players={args.players}")
+    print(f"legacy : {legacy:.3f}s")
+    print(f"current: {current:.3f}s ({legacy / current:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
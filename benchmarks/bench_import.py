@@ -0,0 +1,39 @@
+"""``import tenhoulog``にかかる時間のベンチマーク
+
+新しいプロセスで各import文を実行し, 所要時間の中央値を表示する
+
+    python benchmarks/bench_import.py --repeat 5
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+STATEMENTS = [
+    "import tenhoulog",
+    "from tenhoulog import ResultBook",
+    "from tenhoulog.plotting import pyplot; pyplot()",
+]
+
+
+def measure(statement: str, repeat: int) -> float:
+    elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True)
+        elapsed.append(time.perf_counter() - start)
+    return statistics.median(elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    baseline = measure("pass", args.repeat)
+    for statement in STATEMENTS:
+        print(f"{measure(statement, args.repeat) - baseline:.3f}s  {statement}")
+
+
+if __name__ == "__main__":
+    main()
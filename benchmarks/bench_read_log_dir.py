@@ -0,0 +1,51 @@
+"""read_log_dirのベンチマーク
+
+合成した日別ログを一時ディレクトリに書き出し, プロセス数ごとの読み込み時間を比較する
+
+    python benchmarks/bench_read_log_dir.py --days 32 --games 20000
+"""
+import argparse
+import gzip
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from corpus import format_log_line, synthetic_results
+
+from tenhoulog.reader import read_log_dir
+
+
+def write_logs(directory: Path, days: int, games: int, players: int) -> None:
+    start = date(2020, 1, 1)
+    for day in range(days):
+        results = synthetic_results(games, players, seed=day)
+        path = directory / f"scc{start + timedelta(days=day):%Y%m%d}.html.gz"
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write("\n".join(format_log_line(result) for result in results))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=16)
+    parser.add_argument("--games", type=int, default=10000, help="1日あたりの試合数")
+    parser.add_argument("--players", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_logs(Path(directory), args.days, args.games, args.players)
+        print(f"days={args.days} games/day={args.games} cpus={os.cpu_count()}")
+        baseline = None
+        processes = 1
+        while processes <= (os.cpu_count() or 1):
+            start = time.perf_counter()
+            read_log_dir(directory, processes=processes, errors=[]).build_compact()
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"processes={processes:2d}: {elapsed:.3f}s ({baseline / elapsed:.2f}x)")
+            processes *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""ベンチマーク用の合成した対戦成績
+
+シードを固定して, 天鳳の得点計算に沿った試合結果を生成する.
+nodocchi.moeのAPIのJSONと, 天鳳公式の文字列形式の日別ログとして書き出せる
+
+    python benchmarks/corpus.py out/ --games 100000 --players 1000 --four-player-ratio 0.7
+"""
+import argparse
+import gzip
+import json
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from tenhoulog.models import GameResult
+
+JST = timezone(timedelta(hours=9))
+START = datetime(2020, 1, 1, tzinfo=JST)
+FIELDS = list(GameResult.__fields__)
+# 人数ごとの(配給原点の合計, 返し, ウマ+オカ)
+RULES = {
+    4: (100000, 30000, np.array([40.0, 10.0, -10.0, -20.0])),
+    3: (105000, 40000, np.array([30.0, 0.0, -15.0])),
+}
+
+
+def _seats(rng: np.random.Generator, n_games: int, n_players: int) -> np.ndarray:
+    """(試合数, 4)の重複の無い参加者の番号. 一部のプレイヤーほど多く打つようにZipf風の重みで選ぶ"""
+    if n_players < 4:
+        raise ValueError("n_players must be at least 4")
+    weights = 1 / (np.arange(n_players) + 10.0)
+    weights /= weights.sum()
+    seats = rng.choice(n_players, size=(n_games, 4), p=weights)
+    while True:
+        ordered = np.sort(seats, axis=1)
+        duplicated = (ordered[:, 1:] == ordered[:, :-1]).any(axis=1)
+        if not duplicated.any():
+            return seats
+        seats[duplicated] = rng.choice(n_players, size=(int(duplicated.sum()), 4), p=weights)
+
+
+def synthetic_games(
+    n_games: int, n_players: int = 1000, four_player_ratio: float = 0.5, seed: int = 0, lobby: str = "L1000"
+) -> pd.DataFrame:
+    """1試合1行のDataFrame(``games_frame``と同じ列)で合成した試合結果を返す
+
+    素点は人数に応じた配給原点を100点単位で分け, 天鳳と同じく返しとウマ・オカで得点にする.
+    starttimeは日本時間で, 平均30秒間隔
+    """
+    rng = np.random.default_rng(seed)
+    playernum = np.where(rng.random(n_games) < four_player_ratio, 4, 3)
+    seats = _seats(rng, n_games, n_players)
+    active = np.arange(4) < playernum[:, None]
+
+    shares = np.where(active, rng.gamma(4.0, size=(n_games, 4)), 0.0)
+    shares /= shares.sum(axis=1, keepdims=True)
+    totals = np.where(playernum == 4, RULES[4][0], RULES[3][0])
+    scores = np.floor(shares * totals[:, None] / 100) * 100
+    scores[:, 0] += totals - scores.sum(axis=1)
+    scores = -np.sort(-np.where(active, scores, -np.inf), axis=1)
+
+    points = np.full((n_games, 4), np.nan)
+    tips = np.full((n_games, 4), np.nan)
+    raw_tips = rng.integers(-3, 4, size=(n_games, 4)).astype(float)
+    for num, (_, base, uma) in RULES.items():
+        rows = playernum == num
+        points[rows, :num] = np.round((scores[rows, :num] - base) / 1000 + uma, 1)
+        tips[rows, :num] = raw_tips[rows, :num]
+        tips[rows, num - 1] = -raw_tips[rows, : num - 1].sum(axis=1)
+
+    names = np.array([f"player{i}" for i in range(n_players)] + [None], dtype=object)
+    seats = np.where(active, seats, n_players)
+    seconds = np.cumsum(rng.exponential(30.0, n_games)).astype("timedelta64[s]")
+    data: Dict[str, Any] = {"lobby": lobby, "playernum": playernum}
+    for rank in range(1, 5):
+        data[f"player{rank}"] = names[seats[:, rank - 1]]
+        data[f"player{rank}ptr"] = points[:, rank - 1]
+        data[f"player{rank}shuugi"] = tips[:, rank - 1]
+    data["starttime"] = pd.Series(pd.Timestamp(START) + pd.to_timedelta(seconds))
+    return pd.DataFrame(data, columns=FIELDS)
+
+
+def to_results(games: pd.DataFrame) -> List[GameResult]:
+    """GameResultのリストに変換. 生成した値は正しいので検証は省く"""
+    results = []
+    for row in games.to_dict("records"):
+        for rank in range(row["playernum"] + 1, 5):
+            row[f"player{rank}"] = row[f"player{rank}ptr"] = row[f"player{rank}shuugi"] = None
+        for rank in range(1, row["playernum"] + 1):
+            row[f"player{rank}shuugi"] = int(row[f"player{rank}shuugi"])
+        row["starttime"] = row["starttime"].to_pydatetime()
+        results.append(GameResult.construct(**row))
+    return results
+
+
+def synthetic_results(
+    n_games: int, n_players: int = 1000, seed: int = 0, four_player_ratio: float = 0.5
+) -> List[GameResult]:
+    """合成した試合結果をGameResultのリストで返す"""
+    return to_results(synthetic_games(n_games, n_players, four_player_ratio, seed))
+
+
+def to_api_json(games: pd.DataFrame) -> str:
+    """nodocchi.moeのAPIと同じ形式のJSON. 値は文字列で, starttimeはUNIX時間"""
+    rows = []
+    unixtime = (games["starttime"] - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+    for row, t in zip(games.to_dict("records"), unixtime.tolist()):
+        item = {"lobby": row["lobby"], "playernum": str(row["playernum"]), "starttime": str(t)}
+        for rank in range(1, row["playernum"] + 1):
+            item[f"player{rank}"] = row[f"player{rank}"]
+            item[f"player{rank}ptr"] = f"{row[f'player{rank}ptr']:.1f}"
+            item[f"player{rank}shuugi"] = str(int(row[f"player{rank}shuugi"]))
+        rows.append(item)
+    return json.dumps({"earliest": None, "lobby": None, "list": rows}, ensure_ascii=False)
+
+
+def format_log_line(result: Any) -> str:
+    """GameResult(または同じ属性を持つもの)を天鳳公式の文字列形式の1行にする"""
+    rule = "四般南喰赤祝" if result.playernum == 4 else "三般南喰赤祝"
+    records = []
+    for rank in range(1, result.playernum + 1):
+        point = getattr(result, f"player{rank}ptr")
+        tip = int(getattr(result, f"player{rank}shuugi"))
+        records.append(f"{getattr(result, f'player{rank}')}({point:+.1f},{tip:+d}枚)")
+    return f"{result.lobby} | {result.starttime:%H:%M} | {rule} | {' '.join(records)}"
+
+
+def to_text_logs(games: pd.DataFrame) -> Dict[date, str]:
+    """日本時間の日ごとの天鳳公式の文字列形式のログ"""
+    logs: Dict[date, List[str]] = {}
+    starttime = games["starttime"].dt.tz_convert(JST)
+    for row in games.assign(starttime=starttime).itertuples(index=False):
+        logs.setdefault(row.starttime.date(), []).append(format_log_line(row))
+    return {day: "\n".join(lines) for (day, lines) in logs.items()}
+
+
+def write_corpus(directory: Path, games: pd.DataFrame) -> None:
+    """api.jsonと日別のログscc{YYYYMMDD}.html.gzを書き出す"""
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / "api.json").write_text(to_api_json(games), encoding="utf-8")
+    for day, text in to_text_logs(games).items():
+        with gzip.open(directory / f"scc{day:%Y%m%d}.html.gz", "wt", encoding="utf-8") as f:
+            f.write(text)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--players", type=int, default=1000)
+    parser.add_argument("--four-player-ratio", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    games = synthetic_games(args.games, args.players, args.four_player_ratio, args.seed)
+    write_corpus(args.directory, games)
+
+
+if __name__ == "__main__":
+    main()
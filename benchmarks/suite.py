@@ -0,0 +1,164 @@
+"""主要な処理のベンチマーク
+
+合成した対戦成績(corpus.pyを参照)に対して, 試合数ごとに各処理の所要時間とピークメモリを測る.
+時間はrepeat回の最小値, ピークメモリはtracemallocで測った処理中の確保量の最大値.
+--saveで結果をJSONに保存し, --baselineで保存した結果と比較する. 比較して遅くなった処理があれば終了コードは1
+
+    python benchmarks/suite.py --scales 1000,10000,100000 --save baseline.json
+    python benchmarks/suite.py --scales 1000,10000,100000 --baseline baseline.json
+    python benchmarks/suite.py --scales 1000000 --cases from_results,aggregate
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+from corpus import format_log_line, synthetic_games, to_results
+
+from tenhoulog.models import GameResult, ResultBook
+
+
+@dataclass
+class Measurement:
+    case: str
+    games: int
+    seconds: float
+    peak_mb: float
+
+
+class Corpus:
+    """1つの規模の入力. 各処理の入力は初めて使うときに作る"""
+
+    def __init__(self, n_games: int, n_players: int, four_player_ratio: float, book_players: int, seed: int):
+        self.games = synthetic_games(n_games, n_players, four_player_ratio, seed)
+        # 重みの大きい(よく打つ)順に選ぶ
+        self.player_names = [f"player{i}" for i in range(min(book_players, n_players))]
+        self._cache: Dict[str, Any] = {}
+
+    def _get(self, name: str, factory: Callable[[], Any]) -> Any:
+        if name not in self._cache:
+            self._cache[name] = factory()
+        return self._cache[name]
+
+    @property
+    def text(self) -> str:
+        return self._get("text", lambda: "\n".join(format_log_line(row) for row in self.games.itertuples()))
+
+    @property
+    def results(self) -> List[GameResult]:
+        return self._get("results", lambda: to_results(self.games))
+
+    @property
+    def book(self) -> ResultBook:
+        return self._get("book", lambda: ResultBook.from_results(self.games, self.player_names))
+
+    @property
+    def halves(self) -> List[ResultBook]:
+        half = len(self.games) // 2
+        parts = (self.games[:half], self.games[half:])
+        return self._get("halves", lambda: [ResultBook.from_results(games, self.player_names) for games in parts])
+
+    @property
+    def period(self) -> Any:
+        starttime = self.games["starttime"]
+        span = starttime.iloc[-1] - starttime.iloc[0]
+        return (starttime.iloc[0] + span / 4, starttime.iloc[0] + span * 3 / 4)
+
+
+def _plot(book: ResultBook, **kwargs: Any) -> None:
+    from tenhoulog.plotting import pyplot
+
+    fig = book.plot_cumsum(**kwargs)
+    if not kwargs.get("fast"):
+        pyplot().close(fig)
+
+
+# 処理名 -> 入力を受け取り, 計測する処理を返す関数
+CASES: Dict[str, Callable[[Corpus], Callable[[], Any]]] = {
+    "parse_str": lambda c: lambda: GameResult.parse_str(c.text, date(2020, 1, 1)),
+    "from_results": lambda c: lambda: ResultBook.from_results(c.results, c.player_names),
+    "aggregate": lambda c: lambda: c.book.aggregate(4),
+    "filter_by_period": lambda c: lambda: c.book.filter_by_period(c.period),
+    "__add__": lambda c: lambda: c.halves[0] + c.halves[1],
+    "plot_cumsum": lambda c: lambda: _plot(c.book),
+    "plot_cumsum_fast": lambda c: lambda: _plot(c.book, fast=True),
+}
+
+
+def measure(name: str, corpus: Corpus, repeat: int) -> Measurement:
+    func = CASES[name](corpus)
+    func()  # 入力の生成とキャッシュを計測から除く
+    elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Measurement(name, len(corpus.games), min(elapsed), peak / 2**20)
+
+
+def compare(measurements: List[Measurement], baseline: List[Measurement], threshold: float) -> bool:
+    """baselineとの比を表示する. threshold倍より遅くなった処理があればTrue"""
+    previous = {(m.case, m.games): m for m in baseline}
+    regressed = False
+    for m in measurements:
+        base = previous.get((m.case, m.games))
+        if base is None:
+            continue
+        ratio = m.seconds / base.seconds
+        mark = "  <- regression" if ratio > threshold else ""
+        regressed = regressed or bool(mark)
+        print(f"{m.case:>18s} {m.games:>9d}  {base.seconds:9.4f}s -> {m.seconds:9.4f}s ({ratio:5.2f}x){mark}")
+    return regressed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", default="1000,10000,100000", help="試合数のカンマ区切り")
+    parser.add_argument("--cases", default=",".join(CASES), help="処理名のカンマ区切り")
+    parser.add_argument("--players", type=int, default=1000)
+    parser.add_argument("--book-players", type=int, default=100, help="ResultBookに含めるプレイヤー数")
+    parser.add_argument("--four-player-ratio", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", type=Path, help="結果を保存するJSON")
+    parser.add_argument("--baseline", type=Path, help="比較する以前の結果のJSON")
+    parser.add_argument("--threshold", type=float, default=1.2, help="この倍率より遅ければ後退とみなす")
+    args = parser.parse_args(argv)
+
+    measurements = []
+    for n_games in map(int, args.scales.split(",")):
+        corpus = Corpus(n_games, args.players, args.four_player_ratio, args.book_players, args.seed)
+        for name in args.cases.split(","):
+            m = measure(name, corpus, args.repeat)
+            measurements.append(m)
+            print(f"{m.case:>18s} {m.games:>9d}  {m.seconds:9.4f}s  {m.peak_mb:9.1f}MB", flush=True)
+
+    if args.save:
+        data = {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "measurements": [asdict(m) for m in measurements],
+        }
+        args.save.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    if args.baseline:
+        baseline = [Measurement(**m) for m in json.loads(args.baseline.read_text(encoding="utf-8"))["measurements"]]
+        print()
+        return int(compare(measurements, baseline, args.threshold))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
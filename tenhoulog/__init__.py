@@ -1,9 +1,25 @@
-from .models import ResultBook, GameResult
-from .io import fetch_lobby_log, fetch_player_log
+from typing import TYPE_CHECKING, Any
+
+from .models import GameResult
+from .io import fetch_lobby_log, fetch_player_log, fetch_many_lobbies, fetch_many_players
+
+if TYPE_CHECKING:
+    from .book import ResultBook
 
 __all__ = [
     "ResultBook",
     "GameResult",
     "fetch_lobby_log",
     "fetch_player_log",
+    "fetch_many_lobbies",
+    "fetch_many_players",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    # ResultBookはpandasに依存するため, 初めて参照されたときに読み込む
+    if name == "ResultBook":
+        from .book import ResultBook
+
+        return ResultBook
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
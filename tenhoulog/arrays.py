@@ -0,0 +1,128 @@
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .models import GameResult, GameTuple
+
+FIELDS = list(GameResult.__fields__)
+# 祝儀が無いことを表す値
+NO_TIP = np.iinfo(np.int16).min
+
+
+class GameResultArray:
+    """試合結果を列ごとの型付き配列で保持するコンテナ
+
+    名前は文字列表へのコード, 祝儀はint16, starttimeはdatetime64で保持するため,
+    1試合あたり100バイト程度で済む. 要素はGameTupleとして取り出せる
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], names: List[str], tz: Any = None):
+        self.columns = columns
+        self.names = names  # コードに対応する名前
+        self.tz = tz  # starttimeのタイムゾーン. 配列はUTCで保持する
+
+    def __len__(self) -> int:
+        return len(self.columns["playernum"])
+
+    def __iter__(self) -> Iterator[GameTuple]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, i: int) -> GameTuple:
+        values: List[Any] = []
+        for field in FIELDS:
+            value = self.columns[field][i]
+            if field == "starttime":
+                timestamp = pd.Timestamp(value)
+                if self.tz is not None:
+                    timestamp = timestamp.tz_localize("UTC").tz_convert(self.tz)
+                values.append(timestamp.to_pydatetime())
+            elif field == "playernum":
+                values.append(int(value))
+            elif field.endswith("ptr"):
+                values.append(None if np.isnan(value) else float(value))
+            elif field.endswith("shuugi"):
+                values.append(None if value == NO_TIP else int(value))
+            else:
+                values.append(None if value < 0 else self.names[value])
+        return GameTuple(*values)
+
+    @classmethod
+    def from_frame(cls, games: pd.DataFrame, names: Optional[List[str]] = None) -> "GameResultArray":
+        """1試合1行のDataFrame(``games_frame``を参照)から生成
+
+        namesを指定すると, その名前表を引き継いで新しい名前を追加する
+        """
+        names = list(names or [])
+        codes = {name: code for (code, name) in enumerate(names)}
+        columns: Dict[str, np.ndarray] = {}
+        starttime = pd.to_datetime(games["starttime"])
+        tz = starttime.dt.tz
+        if tz is not None:
+            starttime = starttime.dt.tz_convert("UTC").dt.tz_localize(None)
+        for field in FIELDS:
+            column = games[field]
+            if field == "starttime":
+                columns[field] = starttime.to_numpy(dtype="datetime64[ns]")
+            elif field.endswith("ptr"):
+                columns[field] = column.to_numpy(dtype=np.float64, na_value=np.nan)
+            elif field.endswith("shuugi"):
+                columns[field] = column.astype(float).fillna(NO_TIP).to_numpy().astype(np.int16)
+            elif field == "playernum":
+                columns[field] = column.to_numpy().astype(np.int8)
+            else:
+                inverse, uniques = pd.factorize(column)
+                mapping = np.empty(len(uniques) + 1, dtype=np.int32)
+                mapping[-1] = -1  # factorizeは欠損を-1にする
+                for i, name in enumerate(uniques):
+                    if name not in codes:
+                        codes[name] = len(names)
+                        names.append(name)
+                    mapping[i] = codes[name]
+                columns[field] = mapping[inverse]
+        return cls(columns, names, tz)
+
+    @classmethod
+    def from_results(
+        cls, results: Iterable[Union[GameResult, GameTuple]], chunk_size: int = 100000
+    ) -> "GameResultArray":
+        """GameResultまたはGameTupleから生成. chunk_size試合ずつ変換して連結する"""
+        from .book import games_frame_from_results
+
+        iterator = iter(results)
+        arrays: List[GameResultArray] = []
+        names: List[str] = []
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            array = cls.from_frame(games_frame_from_results(chunk), names)
+            names = array.names
+            arrays.append(array)
+            if len(chunk) < chunk_size:
+                break
+        columns = {field: np.concatenate([array.columns[field] for array in arrays]) for field in FIELDS}
+        return cls(columns, names, arrays[0].tz)
+
+    def to_frame(self) -> pd.DataFrame:
+        """1試合1行のDataFrameに変換"""
+        names = np.array(self.names + [None], dtype=object)  # コード-1はNoneになる
+        data: Dict[str, Any] = {}
+        for field in FIELDS:
+            column = self.columns[field]
+            if field == "starttime":
+                starttime = pd.Series(column)
+                if self.tz is not None:
+                    starttime = starttime.dt.tz_localize("UTC").dt.tz_convert(self.tz)
+                data[field] = starttime
+            elif field.endswith("shuugi"):
+                data[field] = np.where(column == NO_TIP, np.nan, column)
+            elif field.endswith("ptr") or field == "playernum":
+                data[field] = column
+            else:
+                data[field] = names[column]
+        return pd.DataFrame(data, columns=FIELDS)
+
+    def to_results(self) -> List[GameResult]:
+        """GameResultのリストに変換"""
+        return [game.to_model() for game in self]
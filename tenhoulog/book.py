@@ -0,0 +1,466 @@
+from dataclasses import dataclass
+from datetime import datetime, tzinfo
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Sequence, Set, Tuple, Type, TypeVar, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .arrays import GameResultArray
+from .metrics import stage
+from .models import JST, GameResult, GameTuple
+from .plotting import plot_lines, pyplot
+from .stats import (
+    BOOTSTRAP_STATS,
+    CUMULATIVE_COLUMNS,
+    bootstrap,
+    cumulative,
+    head_to_head,
+    pivot_history,
+    player_history,
+)
+
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+
+    from .rollup import DailyRollup
+
+# 試合結果として受け付ける形式. DataFrameは``games_frame``と同じ列を持つもの
+Results = Union[Sequence[GameResult], Sequence[GameTuple], GameResultArray, pd.DataFrame]
+
+B = TypeVar("B", bound="BookMixin")
+
+
+def games_frame(rows: List[Dict[str, Any]]) -> pd.DataFrame:
+    """GameResultのフィールドを列とするDataFrameを生成
+
+    得点・祝儀はfloat, starttimeはUTCのdatetime64にまとめて変換する
+    """
+    df = pd.DataFrame(rows, columns=list(GameResult.__fields__))
+    df["playernum"] = df["playernum"].astype(int)
+    for rank in range(1, 5):
+        df[f"player{rank}ptr"] = df[f"player{rank}ptr"].astype(float)
+        df[f"player{rank}shuugi"] = df[f"player{rank}shuugi"].astype(float)
+    unixtime = pd.to_numeric(df["starttime"], errors="coerce")
+    if len(df) and unixtime.notnull().all():
+        df["starttime"] = pd.to_datetime(unixtime, unit="s", utc=True)
+    else:
+        df["starttime"] = pd.to_datetime(df["starttime"], utc=True)
+    return df
+
+
+def games_frame_from_results(results: Sequence[Union[GameResult, GameTuple]]) -> pd.DataFrame:
+    """GameResultまたはGameTupleのリストを1試合1行のDataFrameに変換
+
+    ``games_frame``と違い, starttimeなどの値は変換せずにそのまま保持する
+    """
+    columns = list(GameResult.__fields__)
+    if results and isinstance(results[0], tuple):
+        return pd.DataFrame.from_records(results, columns=columns)
+    return pd.DataFrame([result.__dict__ for result in results], columns=columns)
+
+
+def to_games_frame(results: "Results") -> pd.DataFrame:
+    """``Results``のいずれの形式でも1試合1行のDataFrameに変換"""
+    if isinstance(results, pd.DataFrame):
+        return results
+    if isinstance(results, GameResultArray):
+        return results.to_frame()
+    return games_frame_from_results(results)
+
+
+def long_frame(games: pd.DataFrame) -> pd.DataFrame:
+    """1試合1行のDataFrameを1プレイヤー1試合1行の縦持ちに変換
+
+    列は(game_id, player, rank, point, tip, starttime, playernum). game_idはgamesにおける行番号
+    """
+    games = games.reset_index(drop=True)
+    game_id = pd.Series(np.arange(len(games)))
+    parts = [
+        pd.DataFrame(
+            {
+                "game_id": game_id,
+                "player": games[f"player{rank}"],
+                "rank": rank,
+                "point": games[f"player{rank}ptr"],
+                "tip": games[f"player{rank}shuugi"],
+                "starttime": games["starttime"],
+                "playernum": games["playernum"],
+            }
+        )
+        for rank in range(1, 5)
+    ]
+    long = pd.concat(parts, ignore_index=True)
+    long = long[long["player"].notnull()].astype({"point": float, "tip": float, "playernum": np.int8})
+    return long.sort_values(["game_id", "rank"], kind="stable").reset_index(drop=True)
+
+
+def align_timestamp(t: datetime, tz: Any) -> pd.Timestamp:
+    """tz-awareな時刻を比較対象のタイムゾーンtzに揃える"""
+    timestamp = pd.Timestamp(t)
+    if tz is not None and timestamp.tzinfo is not None:
+        return timestamp.tz_convert(tz)
+    return timestamp
+
+
+# attr名と縦持ちの列名の対応
+VALUE_COLUMNS = {"scores": "point", "ranks": "rank", "tips": "tip"}
+AGGREGATE_COLUMNS = ["名前", "回数", "得点", "順位分布", "平均順位", "祝儀"]
+EXTRA_AGGREGATE_COLUMNS = ["トップ率", "ラス回避率", "平均得点"]
+
+
+def count_ranks(ranks: np.ndarray, player_num: int) -> np.ndarray:
+    """(試合数, プレイヤー数)の順位の配列から, プレイヤーごとの各順位の回数を数える
+
+    Returns:
+        (プレイヤー数, player_num)の配列
+    """
+    n_players = ranks.shape[1]
+    valid = (ranks >= 1) & (ranks <= player_num)
+    players = np.broadcast_to(np.arange(n_players), ranks.shape)[valid]
+    bins = players * player_num + ranks[valid].astype(int) - 1
+    return np.bincount(bins, minlength=n_players * player_num).reshape(n_players, player_num)
+
+
+def summarize(
+    players: List[str],
+    times: np.ndarray,
+    score_sum: np.ndarray,
+    rank_counts: np.ndarray,
+    rank_sum: np.ndarray,
+    tip_sum: np.ndarray,
+    extra: bool = False,
+) -> pd.DataFrame:
+    """プレイヤーごとの部分和から``ResultBook.aggregate``の結果を生成"""
+    times = np.asarray(times, dtype=int)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rank_avg = np.where(times > 0, rank_sum / times, np.nan)
+        df = pd.DataFrame(
+            {
+                "名前": players,
+                "回数": times,
+                "得点": np.asarray(score_sum, dtype=float),
+                "順位分布": ["-".join(map(str, counts)) for counts in rank_counts.tolist()],
+                "平均順位": rank_avg,
+                "祝儀": np.asarray(tip_sum).astype(int),
+            },
+            columns=AGGREGATE_COLUMNS,
+        )
+        if extra:
+            df["トップ率"] = rank_counts[:, 0] / times
+            df["ラス回避率"] = 1 - rank_counts[:, -1] / times
+            df["平均得点"] = df["得点"] / times
+    return df
+
+
+# 部分和の順位分布として保持する最大の順位
+MAX_RANK = 4
+
+
+def summarize_players(
+    names: Sequence[str],
+    codes: Dict[str, int],
+    totals: Dict[str, np.ndarray],
+    player_num: int,
+    extra: bool = False,
+) -> pd.DataFrame:
+    """プレイヤーのコード順に並んだ部分和から, namesのプレイヤーの``ResultBook.aggregate``の結果を生成
+
+    totalsはtimes, score_sum, rank_sum, tip_sumと, (プレイヤー数, MAX_RANK)のrank_countsを持つ.
+    codesに無いプレイヤーは0試合とする
+    """
+    names = list(names)
+    index = np.array([codes.get(name, -1) for name in names], dtype=np.int64)
+    known = index >= 0
+
+    def pick(values: np.ndarray) -> np.ndarray:
+        picked = np.zeros((len(names),) + values.shape[1:], dtype=values.dtype)
+        picked[known] = values[index[known]]
+        return picked
+
+    return summarize(
+        names,
+        times=pick(totals["times"]),
+        score_sum=pick(totals["score_sum"]),
+        rank_counts=pick(totals["rank_counts"])[:, :player_num],
+        rank_sum=pick(totals["rank_sum"]),
+        tip_sum=pick(totals["tip_sum"]),
+        extra=extra,
+    )
+
+
+class BookMixin:
+    """帳簿に共通のメソッド
+
+    ``to_long``, ``players``, ``from_long``を実装したクラスに,
+    縦持ちのDataFrameを渡してstats, plotting, storeへ委譲するメソッドを与える
+    """
+
+    @property
+    def players(self) -> List[str]:
+        raise NotImplementedError
+
+    def to_long(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    @classmethod
+    def from_long(cls: Type[B], long: pd.DataFrame, player_names: List[str]) -> B:
+        raise NotImplementedError
+
+    def to_parquet(self, path: Union[str, Path]) -> None:
+        """starttimeの月ごとに分割したParquetとして保存する. pyarrowが必要"""
+        from .store import write_long
+
+        write_long(self.to_long(), path, self.players)
+
+    @classmethod
+    def from_parquet(
+        cls: Type[B],
+        path: Union[str, Path],
+        time_period: Optional[Tuple[datetime, datetime]] = None,
+        player_names: Optional[List[str]] = None,
+    ) -> B:
+        """``to_parquet``で保存したBookを読み込む
+
+        time_periodを指定すると, その期間を含む月のファイルだけを読み込んでフィルタする
+        """
+        from .store import read_long
+
+        long, players = read_long(path, time_period)
+        return cls.from_long(long, player_names or players)
+
+    def head_to_head(self, top_k: Optional[int] = None) -> pd.DataFrame:
+        """プレイヤー同士の対戦成績(``stats.head_to_head``を参照)"""
+        return head_to_head(self.to_long(), top_k)
+
+    def history(self, player_num: int, window: int = 10) -> pd.DataFrame:
+        """プレイヤーごとの直近window試合の成績・連続トップ/ラス・レート・段位の推移(``stats.player_history``を参照)"""
+        return player_history(self.to_long(), player_num, window)
+
+    def bootstrap(
+        self,
+        n_resamples: int = 1000,
+        stats: Sequence[str] = BOOTSTRAP_STATS,
+        confidence: float = 0.95,
+        seed: Optional[int] = None,
+        processes: Optional[int] = 1,
+    ) -> pd.DataFrame:
+        """平均順位などの統計量のブートストラップ法による信頼区間(``stats.bootstrap``を参照)"""
+        return bootstrap(self.to_long(), n_resamples, stats, confidence, seed, processes, self.players)
+
+    def plot_cumsum(
+        self,
+        attr: str = "scores",
+        fast: bool = False,
+        top_n: Optional[int] = None,
+        highlight: Sequence[str] = (),
+        path: Optional[Union[str, Path]] = None,
+        history: Optional[pd.DataFrame] = None,
+    ) -> "Figure":
+        """得点または祝儀の推移を可視化
+
+        Args:
+            - attr (str): ``scores`` or ``tips``を選択. Default to ``scores``.
+            - fast (bool): Trueにすると, 間引いた系列を1つのLineCollectionとしてAggで描画する.
+              以下の引数はfast=Trueのときのみ有効(``plotting.plot_lines``を参照)
+            - top_n (int, optional): 累積値の大きい上位top_n人だけを描画する
+            - highlight (Sequence[str]): 色を付けて描画するプレイヤー
+            - path (str or Path, optional): 指定するとその画像ファイルに保存する
+            - history (pd.DataFrame, optional): 計算済みの``history``の結果. 指定するとその累積値を再計算せずに使う
+        """
+        with stage("plot", fast=str(fast)) as s:
+            if history is not None:
+                table = pivot_history(history, CUMULATIVE_COLUMNS[VALUE_COLUMNS[attr]], self.players)
+            else:
+                table = cumulative(self.to_long(), VALUE_COLUMNS[attr], self.players)
+            s.add(rows=len(table))
+            if fast:
+                return plot_lines(table, "得点推移", top_n=top_n, highlight=highlight, path=path)
+            fig, ax = pyplot().subplots()
+            table.plot(ax=ax)
+            ax.set_title("得点推移")
+            ax.legend(loc="upper left")
+            return fig
+
+
+@dataclass
+class ResultBook(BookMixin):
+    """複数試合の結果をまとめた帳簿"""
+
+    scores: pd.DataFrame  # 得点
+    ranks: pd.DataFrame  # 順位
+    tips: pd.DataFrame  # 祝儀
+    playernum: Optional[pd.Series] = None  # 各試合の対戦人数(scoresと同じindex). 不明ならNone
+
+    @property
+    def player_names(self) -> Set[str]:
+        return set(self.scores.columns) - {"starttime"}
+
+    @property
+    def players(self) -> List[str]:
+        """列の順に並べたプレイヤー名"""
+        return [column for column in self.scores.columns if column != "starttime"]
+
+    def to_long(self) -> pd.DataFrame:
+        """縦持ちのDataFrame(``long_frame``を参照)に変換"""
+        players = self.players
+        scores = self.scores[players].to_numpy(dtype=float)
+        rows, columns = np.nonzero(~np.isnan(scores))
+        long = pd.DataFrame(
+            {
+                "game_id": self.scores.index.to_numpy()[rows],
+                "player": np.array(players, dtype=object)[columns],
+                "rank": self.ranks[players].to_numpy(dtype=float)[rows, columns].astype(int),
+                "point": scores[rows, columns],
+                "tip": self.tips[players].to_numpy(dtype=float)[rows, columns],
+                "starttime": self.scores["starttime"].take(rows).reset_index(drop=True),
+            }
+        )
+        if self.playernum is not None:
+            long["playernum"] = self.playernum.to_numpy()[rows].astype(np.int8)
+        return long.sort_values(["game_id", "rank"], kind="stable").reset_index(drop=True)
+
+    def __add__(self, other: "ResultBook") -> "ResultBook":
+        """他のBookとの結合"""
+        columns = list(dict.fromkeys(list(self.scores.columns) + list(other.scores.columns)))
+
+        def concat(df: pd.DataFrame, other_df: pd.DataFrame) -> pd.DataFrame:
+            return pd.concat([df, other_df], ignore_index=True).reindex(columns=columns)
+
+        scores = concat(self.scores, other.scores)
+        # starttime順を保つ
+        order = np.argsort(scores["starttime"].to_numpy(), kind="stable")
+        playernum = None
+        if self.playernum is not None and other.playernum is not None:
+            playernum = pd.concat([self.playernum, other.playernum], ignore_index=True).take(order)
+        return ResultBook(
+            scores.take(order).reset_index(drop=True),
+            concat(self.ranks, other.ranks).take(order).reset_index(drop=True),
+            concat(self.tips, other.tips).take(order).reset_index(drop=True),
+            playernum.reset_index(drop=True) if playernum is not None else None,
+        )
+
+    @property
+    def starttime_index(self) -> pd.Index:
+        """starttimeのIndex. 初回アクセス時に生成し, scoresが置き換えられるまでキャッシュする"""
+        cached = self.__dict__.get("_starttime_index")
+        if cached is not None and cached[0] is self.scores:
+            return cached[1]
+        index = pd.Index(self.scores["starttime"])
+        self.__dict__["_starttime_index"] = (self.scores, index)
+        return index
+
+    def _period_slice(self, time_period: Tuple[datetime, datetime]) -> Optional[slice]:
+        """starttimeが昇順の場合, 期間に対応する行の範囲を二分探索で求める. 昇順でなければNone"""
+        index = self.starttime_index
+        if not index.is_monotonic_increasing:
+            return None
+        tz = getattr(index, "tz", None)
+        start, end = index.searchsorted([align_timestamp(t, tz) for t in time_period], side="left")
+        return slice(start, end)
+
+    @classmethod
+    def _filter_df_by_period(cls, df: pd.DataFrame, time_period: Tuple[datetime, datetime]) -> pd.DataFrame:
+        return df[(time_period[0] <= df["starttime"]) & (df["starttime"] < time_period[1])]
+
+    def filter_by_period(self, time_period: Tuple[datetime, datetime]) -> "ResultBook":
+        """指定した期間内の結果にフィルタする
+
+        starttimeが昇順であれば二分探索で求めた範囲のスライスを返す
+        """
+        period_slice = self._period_slice(time_period)
+        if period_slice is not None:
+            return self._slice(period_slice)
+        scores = self._filter_df_by_period(self.scores, time_period)
+        return ResultBook(
+            scores,
+            self._filter_df_by_period(self.ranks, time_period),
+            self._filter_df_by_period(self.tips, time_period),
+            self.playernum.loc[scores.index] if self.playernum is not None else None,
+        )
+
+    def filter_by_periods(self, time_periods: List[Tuple[datetime, datetime]]) -> List["ResultBook"]:
+        """複数の期間でまとめてフィルタする
+
+        starttimeが昇順であれば, 全ての期間の端点をまとめて二分探索する
+        """
+        index = self.starttime_index
+        if not index.is_monotonic_increasing:
+            return [self.filter_by_period(time_period) for time_period in time_periods]
+        tz = getattr(index, "tz", None)
+        keys = [align_timestamp(t, tz) for time_period in time_periods for t in time_period]
+        positions = index.searchsorted(keys, side="left").reshape(-1, 2)
+        return [self._slice(slice(start, end)) for (start, end) in positions]
+
+    def _slice(self, rows: slice) -> "ResultBook":
+        playernum = self.playernum.iloc[rows] if self.playernum is not None else None
+        book = ResultBook(self.scores.iloc[rows], self.ranks.iloc[rows], self.tips.iloc[rows], playernum)
+        book.__dict__["_starttime_index"] = (book.scores, self.starttime_index[rows])
+        return book
+
+    def aggregate(self, player_num: int, extra: bool = False) -> pd.DataFrame:
+        """集計を行う
+
+        Args:
+            - player_num (int): 対戦人数. 順位分布の幅になる
+            - extra (bool): トップ率, ラス回避率, 平均得点の列を追加する. Default to False.
+        """
+        with stage("aggregate") as s:
+            players = self.players
+            scores = self.scores[players].to_numpy(dtype=float)
+            ranks = self.ranks[players].to_numpy(dtype=float)
+            tips = self.tips[players].to_numpy(dtype=float)
+            s.add(rows=len(scores))
+            return summarize(
+                players,
+                times=(~np.isnan(scores)).sum(axis=0),
+                score_sum=np.nansum(scores, axis=0),
+                rank_counts=count_ranks(ranks, player_num),
+                rank_sum=np.nansum(ranks, axis=0),
+                tip_sum=np.nansum(tips, axis=0),
+                extra=extra,
+            )
+
+    def rollup(self, tz: tzinfo = JST) -> "DailyRollup":
+        """プレイヤーごと・日ごとの部分和(``rollup.DailyRollup``を参照)を生成. 日の区切りはtzでの0時"""
+        from .rollup import DailyRollup
+
+        return DailyRollup.from_long(self.to_long(), self.players, tz)
+
+    @classmethod
+    def from_results(cls, results: Results, player_names: List[str]) -> "ResultBook":
+        """試合結果をDataFrameに変換
+
+        player_namesで指定したプレイヤーの結果だけが対象.
+        resultsにはGameResultのリストの他, GameTupleのリスト, GameResultArray,
+        ``APIResponse.parse_columns``のDataFrameも指定可能
+        """
+        with stage("from_results") as s:
+            games = to_games_frame(results)
+            s.add(rows=len(games))
+            return cls.from_long(long_frame(games), player_names)
+
+    @classmethod
+    def from_long(cls, long: pd.DataFrame, player_names: List[str]) -> "ResultBook":
+        """縦持ちのDataFrame(``long_frame``を参照)から生成"""
+        columns = player_names + ["starttime"]
+        target = long[long["player"].isin(player_names)].drop_duplicates(["game_id", "player"], keep="last")
+        game_ids = pd.unique(target["game_id"])
+        games = long.drop_duplicates("game_id").set_index("game_id")
+        starttimes = games["starttime"].reindex(game_ids)
+        # starttime順に並べておく(filter_by_periodで二分探索するため)
+        starttimes = starttimes.sort_values(kind="stable")
+        game_ids = starttimes.index.to_numpy()
+        playernum = None
+        if "playernum" in games.columns:
+            playernum = games["playernum"].reindex(game_ids).reset_index(drop=True)
+        wide = target.pivot(index="game_id", columns="player", values=["point", "rank", "tip"])
+        wide = wide.reindex(index=game_ids)
+
+        def to_df(value: str) -> pd.DataFrame:
+            df = wide[value].reindex(columns=player_names) if len(wide) else pd.DataFrame(columns=player_names)
+            df = df.assign(starttime=starttimes).reset_index(drop=True)
+            df.columns = pd.Index(columns)
+            return df
+
+        return ResultBook(to_df("point"), to_df("rank"), to_df("tip"), playernum)
@@ -0,0 +1,118 @@
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterable, List, Optional, Union
+
+from .models import GameResult
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+CREATE TABLE IF NOT EXISTS games (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    game_key TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (kind, key, game_key)
+);
+"""
+
+
+def game_key(result: GameResult) -> str:
+    """重複判定に使う試合のキー(開始時刻 + 参加プレイヤー)"""
+    return "|".join([result.starttime.isoformat()] + result.player_names())
+
+
+def _load(data: str) -> GameResult:
+    """保存したJSONから検証せずにGameResultを復元する. 保存時に検証済みなので再検証は不要"""
+    fields = json.loads(data)
+    fields["starttime"] = datetime.fromisoformat(fields["starttime"])
+    return GameResult.construct(**fields)
+
+
+@dataclass
+class CacheEntry:
+    """キャッシュ済みの対戦成績"""
+
+    fetched_at: float  # 最終取得時刻(UNIX時間)
+    results: List[GameResult]
+
+    @property
+    def latest(self) -> Optional[datetime]:
+        """キャッシュ内で最も新しい対戦の開始時刻"""
+        return max((result.starttime for result in self.results), default=None)
+
+
+class ResultCache:
+    """nodocchi.moeから取得した対戦成績をSQLiteに保存するキャッシュ
+
+    Args:
+        - path (str or Path): DBファイルのパス. ``":memory:"``も指定可能
+        - ttl (timedelta): この期間内に取得した結果は再取得しない. Default to 10 minutes.
+    """
+
+    def __init__(self, path: Union[str, Path], ttl: timedelta = timedelta(minutes=10)):
+        self.ttl = ttl
+        self._conn = sqlite3.connect(str(path))
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "ResultCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return time.time() - entry.fetched_at < self.ttl.total_seconds()
+
+    def get(self, kind: str, key: str) -> Optional[CacheEntry]:
+        """キャッシュ済みの結果を取得. 未取得ならNone"""
+        row = self._conn.execute("SELECT fetched_at FROM entries WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+        if row is None:
+            return None
+        rows = self._conn.execute(
+            "SELECT data FROM games WHERE kind = ? AND key = ? ORDER BY rowid", (kind, key)
+        ).fetchall()
+        return CacheEntry(row[0], [_load(data) for (data,) in rows])
+
+    def merge(
+        self, kind: str, key: str, results: Iterable[GameResult], cached: Optional[List[GameResult]] = None
+    ) -> List[GameResult]:
+        """取得した結果のうち未保存の試合だけを追加し, 取得時刻を更新する
+
+        Args:
+            - cached (List[GameResult], optional): ``get``で取得済みのキャッシュの結果. 省略時は読み込む
+
+        Returns:
+            マージ後の全ての結果(キャッシュの結果に未保存だった試合を加えたもの)
+        """
+        if cached is None:
+            entry = self.get(kind, key)
+            cached = entry.results if entry is not None else []
+        rows = self._conn.execute("SELECT game_key FROM games WHERE kind = ? AND key = ?", (kind, key))
+        known = {k for (k,) in rows}
+        added = []
+        for result in results:
+            k = game_key(result)
+            if k not in known:
+                known.add(k)
+                added.append((k, result))
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO games (kind, key, game_key, data) VALUES (?, ?, ?, ?)",
+                [(kind, key, k, result.json()) for (k, result) in added],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (kind, key, fetched_at) VALUES (?, ?, ?)", (kind, key, time.time())
+            )
+        return cached + [result for (_, result) in added]
@@ -0,0 +1,78 @@
+import argparse
+import asyncio
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional
+
+if TYPE_CHECKING:
+    from .server import BookSource
+
+LOBBY_API_PATH = "/api/lobby.php"
+PLAYER_API_PATH = "/api/listuser.php"
+
+
+def _parse_group(value: str) -> "BookSource":
+    from .server import BookSource
+
+    name, sep, players = value.partition("=")
+    if not sep or not name or not players:
+        raise argparse.ArgumentTypeError(f"expected NAME=PLAYER[,PLAYER...]: {value}")
+    return BookSource(name, "players", players.split(","))
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    from .server import BookServer, BookSource, run_forever
+
+    sources = [BookSource(lobby_id, "lobby", [lobby_id]) for lobby_id in args.lobby] + args.group
+    options = {}
+    if args.api_url:
+        base = args.api_url.rstrip("/")
+        options = {"lobby_url": base + LOBBY_API_PATH, "player_url": base + PLAYER_API_PATH}
+    book_server = BookServer(sources, refresh_interval=args.interval, **options)
+    server = await book_server.start(args.host, args.port)
+    logging.info("serving %d books on http://%s:%d", len(sources), args.host, args.port)
+    try:
+        await run_forever(server)
+    finally:
+        book_server.stop()
+
+
+async def _stub_api(args: argparse.Namespace) -> None:
+    from .server import StubAPI, run_forever, start_http
+
+    server = await start_http(StubAPI(args.directory).handle, args.host, args.port)
+    logging.info("serving stub API from %s on http://%s:%d", args.directory, args.host, args.port)
+    await run_forever(server)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="tenhoulog")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="帳簿をメモリに保持して集計・推移の図を返すHTTPサーバーを起動する")
+    serve.add_argument("--lobby", action="append", default=[], metavar="ID", help="ロビーの帳簿を追加する")
+    serve.add_argument(
+        "--group",
+        action="append",
+        default=[],
+        type=_parse_group,
+        metavar="NAME=PLAYER,...",
+        help="プレイヤーたちの対戦成績からなる帳簿を追加する",
+    )
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument("--interval", type=float, default=600.0, help="取得し直す間隔(秒)")
+    serve.add_argument("--api-url", help="nodocchi.moeの代わりに使うAPIのURL(例: http://127.0.0.1:8001)")
+
+    stub = commands.add_parser("stub-api", help="ディレクトリのJSONを返すnodocchi.moeのAPIのスタブを起動する")
+    stub.add_argument("directory", type=Path, help="lobby/{ID}.json, player/{名前}.jsonを置くディレクトリ")
+    stub.add_argument("--host", default="127.0.0.1")
+    stub.add_argument("--port", type=int, default=8001)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    command = _serve if args.command == "serve" else _stub_api
+    try:
+        asyncio.run(command(args))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,123 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from .book import BookMixin, Results, ResultBook, long_frame, summarize, to_games_frame
+
+
+def _sort_records(records: pd.DataFrame) -> pd.DataFrame:
+    """(starttime, game_id, rank)の順に並べ, game_idをその順の0からの連番に振り直す"""
+    records = records.sort_values(["starttime", "game_id", "rank"], kind="stable").reset_index(drop=True)
+    records["game_id"] = pd.factorize(records["game_id"])[0].astype(np.int32)
+    return records
+
+
+@dataclass
+class CompactResultBook(BookMixin):
+    """縦持ちのDataFrameで結果を保持する帳簿
+
+    ResultBookは(試合数 x プレイヤー数)の密な表を3つ持つが,
+    こちらは1プレイヤー1試合1行で保持するため参加者の多いロビーでも省メモリ.
+    recordsの列は(game_id, player, rank, point, tip, starttime)と, 分かっていればplayernumで,
+    playerはカテゴリ, rankとplayernumはint8, tipはInt16で保持する.
+    推移の計算は行の順に依存するため, recordsは常にstarttime順に並べ, game_idもその順に振り直す
+    """
+
+    records: pd.DataFrame
+
+    @property
+    def player_names(self) -> Set[str]:
+        return set(self.records["player"].cat.categories)
+
+    @property
+    def players(self) -> List[str]:
+        """カテゴリの順に並べたプレイヤー名"""
+        return list(self.records["player"].cat.categories)
+
+    def to_long(self) -> pd.DataFrame:
+        """縦持ちのDataFrame(``long_frame``を参照)に変換"""
+        return self.records.astype({"player": object, "tip": float})
+
+    @classmethod
+    def from_long(cls, long: pd.DataFrame, player_names: Optional[List[str]] = None) -> "CompactResultBook":
+        """縦持ちのDataFrame(``long_frame``を参照)から生成
+
+        player_namesを指定した場合はそのプレイヤーの結果だけが対象
+        """
+        if player_names is not None:
+            long = long[long["player"].isin(player_names)]
+        categories = player_names if player_names is not None else pd.unique(long["player"])
+        records = pd.DataFrame(
+            {
+                "game_id": long["game_id"].astype(np.int32),
+                "player": pd.Categorical(long["player"], categories=categories),
+                "rank": long["rank"].astype(np.int8),
+                "point": long["point"].astype(float),
+                "tip": long["tip"].round().astype("Int16"),
+                "starttime": long["starttime"],
+            }
+        ).reset_index(drop=True)
+        if "playernum" in long.columns:
+            records["playernum"] = long["playernum"].to_numpy().astype(np.int8)
+        return cls(_sort_records(records))
+
+    @classmethod
+    def from_results(
+        cls, results: Results, player_names: Optional[List[str]] = None
+    ) -> "CompactResultBook":
+        """試合結果から生成. 引数は``ResultBook.from_results``と同様"""
+        games = to_games_frame(results)
+        return cls.from_long(long_frame(games), player_names)
+
+    @classmethod
+    def from_book(cls, book: ResultBook) -> "CompactResultBook":
+        """ResultBookから変換"""
+        return cls.from_long(book.to_long(), book.players)
+
+    def to_book(self) -> ResultBook:
+        """密な表を持つResultBookに変換"""
+        return ResultBook.from_long(self.to_long(), self.players)
+
+    def __add__(self, other: "CompactResultBook") -> "CompactResultBook":
+        """他のBookとの結合. otherのgame_idは重ならないようにずらす"""
+        offset = int(self.records["game_id"].max()) + 1 if len(self.records) else 0
+        other_records = other.records.assign(game_id=other.records["game_id"] + offset)
+        player = union_categoricals([self.records["player"], other_records["player"]], ignore_order=True)
+        # 片方にしか無い列(playernum)は落とす
+        columns = [column for column in self.records.columns if column in other_records.columns]
+        records = pd.concat([self.records[columns], other_records[columns]], ignore_index=True)
+        records["player"] = player
+        return CompactResultBook(_sort_records(records))
+
+    def filter_by_period(self, time_period: Tuple[datetime, datetime]) -> "CompactResultBook":
+        """指定した期間内の結果にフィルタする"""
+        starttime = self.records["starttime"]
+        mask = (time_period[0] <= starttime) & (starttime < time_period[1])
+        return CompactResultBook(self.records[mask].reset_index(drop=True))
+
+    def aggregate(self, player_num: int, extra: bool = False) -> pd.DataFrame:
+        """集計を行う. 結果は``ResultBook.aggregate``と同じ形式"""
+        # cat.codesはプレイヤー数によってint8やint16になり, 下の計算で桁あふれするのでint64にする
+        codes = self.records["player"].cat.codes.to_numpy().astype(np.int64)
+        players = self.players
+        n = len(players)
+        ranks = self.records["rank"].to_numpy().astype(int)
+        valid = ranks <= player_num
+        rank_counts = np.bincount(
+            codes[valid] * player_num + ranks[valid] - 1, minlength=n * player_num
+        ).reshape(n, player_num)
+        return summarize(
+            players,
+            times=np.bincount(codes, minlength=n),
+            score_sum=np.bincount(codes, weights=self.records["point"].to_numpy(), minlength=n),
+            rank_counts=rank_counts,
+            rank_sum=np.bincount(codes, weights=ranks, minlength=n),
+            tip_sum=np.bincount(
+                codes, weights=self.records["tip"].to_numpy(dtype=float, na_value=0.0), minlength=n
+            ),
+            extra=extra,
+        )
@@ -0,0 +1,102 @@
+from datetime import tzinfo
+from typing import Any, Dict, Hashable, List, Mapping, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .book import Results, games_frame_from_results, to_games_frame
+from .models import JST
+
+GameKey = Tuple[int, Tuple[Tuple[str, float], ...]]
+
+
+def _localize(starttime: pd.Series, naive_tz: tzinfo) -> pd.Series:
+    starttime = pd.to_datetime(starttime)
+    if starttime.dt.tz is None:
+        return starttime.dt.tz_localize(naive_tz)
+    return starttime.dt.tz_convert(naive_tz)
+
+
+def frame_keys(games: pd.DataFrame, naive_tz: tzinfo = JST) -> List[GameKey]:
+    """1試合1行のDataFrame(``games_frame``を参照)の各行の試合のキー
+
+    キーは(UTCに揃えて分単位に切り捨てたstarttime, 名前順に並べた(名前, 得点)の組).
+    文字列形式のログの開始時刻は分単位なので, 取得元によらず同じ試合は同じキーになる
+    """
+    starttime = _localize(games["starttime"], naive_tz)
+    minutes = starttime.dt.tz_convert("UTC").dt.floor("min").dt.tz_localize(None)
+    times = minutes.to_numpy(dtype="datetime64[m]").astype(np.int64).tolist()
+    names = [games[f"player{rank}"].tolist() for rank in range(1, 5)]
+    points = [games[f"player{rank}ptr"].to_numpy(dtype=float).round(1).tolist() for rank in range(1, 5)]
+    keys: List[GameKey] = []
+    for t, *row in zip(times, *names, *points):
+        pairs = sorted((name, point) for (name, point) in zip(row[:4], row[4:]) if isinstance(name, str))
+        keys.append((t, tuple(pairs)))
+    return keys
+
+
+class Deduplicator:
+    """複数の取得元の試合結果から重複を除く
+
+    これまでに見た試合のキー(``frame_keys``を参照)を集合で保持するため, n試合の重複除去はO(n)で,
+    結果を少しずつ追加していくこともできる. 取得元ごとに残した試合数と除いた試合数を数える
+    """
+
+    def __init__(self, naive_tz: tzinfo = JST):
+        self.naive_tz = naive_tz
+        self.kept: Dict[Hashable, int] = {}
+        self.dropped: Dict[Hashable, int] = {}
+        self._seen: set = set()
+
+    def __len__(self) -> int:
+        """これまでに残した試合数"""
+        return len(self._seen)
+
+    def add(self, results: Results, source: Hashable = None) -> pd.DataFrame:
+        """まだ見ていない試合だけを1試合1行のDataFrameで返す
+
+        取得元によってタイムゾーンの有無が異なっても連結できるよう, starttimeはnaive_tzに揃える
+
+        Args:
+            - results: ``ResultBook.from_results``と同じものを指定できる
+            - source: 取得元の名前. 取得元ごとの件数の集計に使う
+        """
+        games = to_games_frame(results).reset_index(drop=True)
+        keep = np.zeros(len(games), dtype=bool)
+        for i, key in enumerate(frame_keys(games, self.naive_tz)):
+            if key not in self._seen:
+                self._seen.add(key)
+                keep[i] = True
+        n_kept = int(keep.sum())
+        self.kept[source] = self.kept.get(source, 0) + n_kept
+        self.dropped[source] = self.dropped.get(source, 0) + len(games) - n_kept
+        games = games[keep].reset_index(drop=True)
+        return games.assign(starttime=_localize(games["starttime"], self.naive_tz))
+
+    def report(self) -> pd.DataFrame:
+        """取得元ごとの残した試合数と除いた重複の数"""
+        sources = list(self.kept)
+        return pd.DataFrame(
+            {
+                "取得元": sources,
+                "試合数": [self.kept[source] for source in sources],
+                "重複": [self.dropped[source] for source in sources],
+            }
+        )
+
+
+def merge_results(
+    sources: Mapping[Any, Results], naive_tz: tzinfo = JST
+) -> Tuple[pd.DataFrame, Dict[Hashable, int]]:
+    """複数の取得元の試合結果を重複を除いて1つにまとめる
+
+    ``fetch_many_players``などの結果をそのまま渡せる. 先に渡した取得元の試合が優先して残る
+
+    Returns:
+        (1試合1行のDataFrame, 取得元ごとの除いた重複の数)
+    """
+    deduplicator = Deduplicator(naive_tz)
+    frames = [deduplicator.add(results, source) for (source, results) in sources.items()]
+    if not frames:
+        return games_frame_from_results([]), {}
+    return pd.concat(frames, ignore_index=True), deduplicator.dropped
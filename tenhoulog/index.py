@@ -0,0 +1,87 @@
+from functools import reduce
+from typing import Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from .book import Results, ResultBook, long_frame, to_games_frame
+from .compact import CompactResultBook
+
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+
+class GameIndex:
+    """プレイヤーごとの参加試合の転置インデックス
+
+    プレイヤーごとに参加した試合のgame_idを昇順の配列(ポスティングリスト)として保持する.
+    特定のプレイヤー群の帳簿を作る際に, 全試合を走査せずにそのプレイヤー群の試合数に比例する時間で済む
+    """
+
+    def __init__(self, long: pd.DataFrame):
+        """
+        Args:
+            - long (pd.DataFrame): ``long_frame``の形式の全試合の結果. game_id順に並んでいること
+        """
+        self.long = long.reset_index(drop=True)
+        game_ids = self.long["game_id"].to_numpy()
+        # 試合ごとの行の範囲[game_starts[i], game_starts[i + 1])
+        self._game_ids, self._game_starts = np.unique(game_ids, return_index=True)
+        self._game_starts = np.append(self._game_starts, len(game_ids))
+
+        postings = self.long[["game_id", "player"]].drop_duplicates()
+        codes, names = pd.factorize(postings["player"])
+        order = np.argsort(codes, kind="stable")
+        self._postings = postings["game_id"].to_numpy()[order].astype(np.int64)
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(names)))])
+        self._codes = {name: code for (code, name) in enumerate(names)}
+
+    @classmethod
+    def from_results(cls, results: Results) -> "GameIndex":
+        return cls(long_frame(to_games_frame(results)))
+
+    @property
+    def player_names(self) -> List[str]:
+        return list(self._codes)
+
+    def games(self, player: str) -> np.ndarray:
+        """playerが参加した試合のgame_id(昇順)"""
+        code = self._codes.get(player)
+        if code is None:
+            return _EMPTY
+        return self._postings[self._offsets[code] : self._offsets[code + 1]]
+
+    def count(self, player: str) -> int:
+        """playerが参加した試合数"""
+        return len(self.games(player))
+
+    def union(self, players: Iterable[str]) -> np.ndarray:
+        """いずれかのプレイヤーが参加した試合のgame_id(昇順)"""
+        postings = [self.games(player) for player in players]
+        return np.unique(np.concatenate(postings)) if postings else _EMPTY
+
+    def intersection(self, players: Iterable[str]) -> np.ndarray:
+        """全てのプレイヤーが参加した試合のgame_id(昇順)"""
+        postings = sorted((self.games(player) for player in players), key=len)
+        if not postings:
+            return _EMPTY
+        return reduce(lambda a, b: np.intersect1d(a, b, assume_unique=True), postings)
+
+    def cooccurrence(self, player: str, other: str) -> np.ndarray:
+        """playerとotherが同卓した試合のgame_id(昇順)"""
+        return self.intersection([player, other])
+
+    def select(self, game_ids: np.ndarray) -> pd.DataFrame:
+        """指定した試合の縦持ちの結果"""
+        positions = np.searchsorted(self._game_ids, game_ids)
+        starts = self._game_starts[positions]
+        lengths = self._game_starts[positions + 1] - starts
+        rows = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return self.long.iloc[rows]
+
+    def book(self, player_names: List[str]) -> ResultBook:
+        """player_namesのいずれかが参加した試合からResultBookを生成"""
+        return ResultBook.from_long(self.select(self.union(player_names)), player_names)
+
+    def compact_book(self, player_names: List[str]) -> CompactResultBook:
+        """player_namesのいずれかが参加した試合からCompactResultBookを生成"""
+        return CompactResultBook.from_long(self.select(self.union(player_names)), player_names)
@@ -1,19 +1,266 @@
-from typing import List
+import asyncio
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Union, overload
 
 import httpx
 
+from .cache import ResultCache
+from .metrics import stage
 from .models import APIResponse, GameResult
 
+if TYPE_CHECKING:
+    import pandas as pd
+    from typing_extensions import Literal
 
-def fetch_lobby_log(lobby_id: str) -> List[GameResult]:
-    """nodocchi.moeから指定したロビーの対戦成績を取得"""
-    API_URL = "https://nodocchi.moe/api/lobby.php"
-    resp = httpx.post(API_URL, data={"lobby": lobby_id})
-    return APIResponse.parse_raw(resp.text).list
+LOBBY_API_URL = "https://nodocchi.moe/api/lobby.php"
+PLAYER_API_URL = "https://nodocchi.moe/api/listuser.php"
 
+# リトライ対象とするHTTPステータス
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
 
-def fetch_player_log(player_name: str) -> List[GameResult]:
-    """nodocchi.moeから指定したプレイヤーの対戦成績を取得"""
-    API_URL = "https://nodocchi.moe/api/listuser.php"
-    resp = httpx.post(API_URL, data={"name": player_name})
-    return APIResponse.parse_raw(resp.text).list
+
+class FetchManyError(Exception):
+    """並行取得で一部のキーが失敗した. 成功した分はresultsに, 失敗した分はerrorsに入る"""
+
+    def __init__(self, results: Dict[str, List[GameResult]], errors: Dict[str, BaseException]):
+        super().__init__(f"failed to fetch {len(errors)} of {len(results) + len(errors)} keys: {list(errors)}")
+        self.results = results
+        self.errors = errors
+
+
+def _post(url: str, data: Dict[str, str]) -> httpx.Response:
+    with stage("fetch", url=url) as s:
+        resp = httpx.post(url, data=data)
+        s.add(nbytes=len(resp.content))
+    return resp
+
+
+def _parse(text: str) -> List[GameResult]:
+    with stage("parse_raw") as s:
+        results = APIResponse.parse_raw(text).list
+        s.add(rows=len(results))
+    return results
+
+
+def _fetch(
+    url: str, field: str, key: str, cache: Optional[ResultCache], as_frame: bool
+) -> Union[List[GameResult], "pd.DataFrame"]:
+    """1件分を取得. cacheがあればTTL内はキャッシュを返し, それ以降は差分だけをマージする"""
+    if cache is None:
+        resp = _post(url, {field: key})
+        if as_frame:
+            return APIResponse.parse_columns(resp.text)
+        return _parse(resp.text)
+    entry = cache.get(field, key)
+    if entry is not None and cache.is_fresh(entry):
+        results = entry.results
+    else:
+        data = {field: key}
+        latest = entry.latest if entry is not None else None
+        if latest is not None:
+            # キャッシュ済みの最新の対戦以降だけを要求する
+            data["start"] = str(int(latest.timestamp()))
+        resp = _post(url, data)
+        results = cache.merge(field, key, _parse(resp.text), entry.results if entry is not None else [])
+    if as_frame:
+        from .book import games_frame
+
+        return games_frame([result.dict() for result in results])
+    return results
+
+
+@overload
+def fetch_lobby_log(
+    lobby_id: str, cache: Optional[ResultCache] = ..., as_frame: "Literal[False]" = ...
+) -> List[GameResult]:
+    ...
+
+
+@overload
+def fetch_lobby_log(lobby_id: str, cache: Optional[ResultCache] = ..., *, as_frame: "Literal[True]") -> "pd.DataFrame":
+    ...
+
+
+@overload
+def fetch_lobby_log(
+    lobby_id: str, cache: Optional[ResultCache] = ..., as_frame: bool = ...
+) -> Union[List[GameResult], "pd.DataFrame"]:
+    ...
+
+
+def fetch_lobby_log(
+    lobby_id: str, cache: Optional[ResultCache] = None, as_frame: bool = False
+) -> Union[List[GameResult], "pd.DataFrame"]:
+    """nodocchi.moeから指定したロビーの対戦成績を取得
+
+    cacheを指定すると取得済みの結果を再利用し, 新しい対戦だけを追加で取得する.
+    as_frameを指定するとGameResultのリストではなく1試合1行のDataFrameを返す
+    """
+    return _fetch(LOBBY_API_URL, "lobby", lobby_id, cache, as_frame)
+
+
+@overload
+def fetch_player_log(
+    player_name: str, cache: Optional[ResultCache] = ..., as_frame: "Literal[False]" = ...
+) -> List[GameResult]:
+    ...
+
+
+@overload
+def fetch_player_log(player_name: str, cache: Optional[ResultCache] = ..., *, as_frame: "Literal[True]") -> "pd.DataFrame":
+    ...
+
+
+@overload
+def fetch_player_log(
+    player_name: str, cache: Optional[ResultCache] = ..., as_frame: bool = ...
+) -> Union[List[GameResult], "pd.DataFrame"]:
+    ...
+
+
+def fetch_player_log(
+    player_name: str, cache: Optional[ResultCache] = None, as_frame: bool = False
+) -> Union[List[GameResult], "pd.DataFrame"]:
+    """nodocchi.moeから指定したプレイヤーの対戦成績を取得
+
+    cacheを指定すると取得済みの結果を再利用し, 新しい対戦だけを追加で取得する.
+    as_frameを指定するとGameResultのリストではなく1試合1行のDataFrameを返す
+    """
+    return _fetch(PLAYER_API_URL, "name", player_name, cache, as_frame)
+
+
+def _retry_after(resp: httpx.Response) -> Optional[float]:
+    """Retry-Afterヘッダの待ち時間(秒). 秒数とHTTP日付の両方に対応し, 無いか読めなければNone"""
+    value = resp.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        until = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if until.tzinfo is None:
+        until = until.replace(tzinfo=timezone.utc)
+    return max((until - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+async def _post_with_retry(
+    client: httpx.AsyncClient,
+    url: str,
+    data: Dict[str, str],
+    semaphore: asyncio.Semaphore,
+    retries: int,
+    backoff: float,
+    timeout: float,
+) -> str:
+    """リトライ付きでPOSTし, レスポンスの本文を返す
+
+    通信エラーと``RETRY_STATUS_CODES``のステータスは``backoff * 2 ** n``秒待って再試行する.
+    429でRetry-Afterヘッダがあればその秒数だけ待つ
+    """
+    for attempt in range(retries + 1):
+        delay = backoff * 2 ** attempt
+        async with semaphore:
+            try:
+                with stage("fetch", url=url) as s:
+                    resp = await client.post(url, data=data, timeout=timeout)
+                    s.add(nbytes=len(resp.content))
+                if resp.status_code not in RETRY_STATUS_CODES:
+                    resp.raise_for_status()
+                    return resp.text
+                if attempt == retries:
+                    resp.raise_for_status()
+                if resp.status_code == 429:
+                    retry_after = _retry_after(resp)
+                    if retry_after is not None:
+                        delay = retry_after
+            except httpx.TransportError:
+                if attempt == retries:
+                    raise
+        await asyncio.sleep(delay)
+    raise RuntimeError("unreachable")
+
+
+async def _fetch_many(
+    url: str,
+    field: str,
+    keys: Iterable[str],
+    client: Optional[httpx.AsyncClient],
+    max_concurrency: int,
+    retries: int,
+    backoff: float,
+    timeout: float,
+) -> Dict[str, List[GameResult]]:
+    keys = list(dict.fromkeys(keys))
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch(c: httpx.AsyncClient, key: str) -> List[GameResult]:
+        text = await _post_with_retry(c, url, {field: key}, semaphore, retries, backoff, timeout)
+        return _parse(text)
+
+    if client is None:
+        limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+        async with httpx.AsyncClient(limits=limits) as owned_client:
+            outcomes = await asyncio.gather(*[fetch(owned_client, key) for key in keys], return_exceptions=True)
+    else:
+        outcomes = await asyncio.gather(*[fetch(client, key) for key in keys], return_exceptions=True)
+    results: Dict[str, List[GameResult]] = {}
+    errors: Dict[str, BaseException] = {}
+    for key, outcome in zip(keys, outcomes):
+        if isinstance(outcome, BaseException):
+            errors[key] = outcome
+        else:
+            results[key] = outcome
+    if errors:
+        raise FetchManyError(results, errors)
+    return results
+
+
+async def fetch_many_lobbies(
+    lobby_ids: Iterable[str],
+    client: Optional[httpx.AsyncClient] = None,
+    max_concurrency: int = 8,
+    retries: int = 3,
+    backoff: float = 0.5,
+    timeout: float = 30.0,
+    url: str = LOBBY_API_URL,
+) -> Dict[str, List[GameResult]]:
+    """nodocchi.moeから複数ロビーの対戦成績を並行して取得
+
+    Args:
+        - lobby_ids (Iterable[str]): 取得するロビーID
+        - client (httpx.AsyncClient, optional): 使い回すクライアント. 省略時はコネクションプール付きで生成する
+        - max_concurrency (int): 同時リクエスト数の上限
+        - retries (int): 失敗時の再試行回数
+        - backoff (float): 再試行までの待ち時間の基準(秒). 試行ごとに2倍になる
+        - timeout (float): 1リクエストあたりのタイムアウト(秒)
+        - url (str): APIのURL. テスト用のスタブなどに向ける場合に指定する
+
+    Returns:
+        ロビーIDをキーとした対戦成績の辞書
+
+    Raises:
+        FetchManyError: 再試行しても取得できなかったキーがある場合. 他のキーの取得は止めずに最後まで行い,
+            成功した分を``results``に, 失敗したキーと例外を``errors``に持たせる
+    """
+    return await _fetch_many(url, "lobby", lobby_ids, client, max_concurrency, retries, backoff, timeout)
+
+
+async def fetch_many_players(
+    player_names: Iterable[str],
+    client: Optional[httpx.AsyncClient] = None,
+    max_concurrency: int = 8,
+    retries: int = 3,
+    backoff: float = 0.5,
+    timeout: float = 30.0,
+    url: str = PLAYER_API_URL,
+) -> Dict[str, List[GameResult]]:
+    """nodocchi.moeから複数プレイヤーの対戦成績を並行して取得
+
+    引数は``fetch_many_lobbies``と同様. プレイヤー名をキーとした辞書を返す
+    """
+    return await _fetch_many(url, "name", player_names, client, max_concurrency, retries, backoff, timeout)
@@ -0,0 +1,165 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .book import MAX_RANK, Results, ResultBook, long_frame, summarize_players, to_games_frame
+from .compact import CompactResultBook
+
+# 縦持ちのバッファの列とdtype. playerはプレイヤー名のコード, starttimeはUTCに揃えて保持する
+_DTYPES = {
+    "game_id": np.int64,
+    "player": np.int32,
+    "rank": np.int8,
+    "point": np.float64,
+    "tip": np.float64,
+    "starttime": "datetime64[ns]",
+    "playernum": np.int8,
+}
+
+
+class LiveResultBook:
+    """試合結果を逐次追加できる帳簿
+
+    結果は縦持ちの列ごとの配列に保持し, 容量が足りなくなったら倍に拡張するため,
+    k試合の追加はならしO(k)で済む. プレイヤーごとの集計値も追加のたびに更新するので,
+    ``aggregate``は試合数によらずプレイヤー数に比例する時間で返る
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.n_games = 0
+        self._size = 0
+        self._tz: Any = None
+        self._codes: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._columns = {name: np.empty(capacity, dtype=dtype) for (name, dtype) in _DTYPES.items()}
+        self._times = np.zeros(0, dtype=np.int64)
+        self._score_sum = np.zeros(0)
+        self._rank_sum = np.zeros(0)
+        self._tip_sum = np.zeros(0)
+        self._rank_counts = np.zeros((0, MAX_RANK), dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def player_names(self) -> List[str]:
+        """登場順に並べたプレイヤー名"""
+        return list(self._names)
+
+    def _reserve(self, size: int) -> None:
+        capacity = len(self._columns["game_id"])
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity = max(capacity * 2, 1)
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[: self._size] = column[: self._size]
+            self._columns[name] = grown
+
+    def _encode(self, players: pd.Series) -> np.ndarray:
+        """プレイヤー名をコードに変換. 新しいプレイヤーには集計値の領域を確保する"""
+        inverse, uniques = pd.factorize(players)
+        mapping = np.empty(len(uniques), dtype=np.int32)
+        for i, name in enumerate(uniques):
+            if name not in self._codes:
+                self._codes[name] = len(self._names)
+                self._names.append(name)
+            mapping[i] = self._codes[name]
+        n_new = len(self._names) - len(self._times)
+        if n_new > 0:
+            self._times = np.concatenate([self._times, np.zeros(n_new, dtype=np.int64)])
+            self._score_sum = np.concatenate([self._score_sum, np.zeros(n_new)])
+            self._rank_sum = np.concatenate([self._rank_sum, np.zeros(n_new)])
+            self._tip_sum = np.concatenate([self._tip_sum, np.zeros(n_new)])
+            self._rank_counts = np.concatenate([self._rank_counts, np.zeros((n_new, MAX_RANK), dtype=np.int64)])
+        return mapping[inverse]
+
+    def _to_utc(self, starttime: pd.Series) -> np.ndarray:
+        """starttimeをUTCのnaiveな配列にする. タイムゾーンの有無は最初に追加した結果に揃える"""
+        starttime = pd.to_datetime(starttime)
+        if self.n_games == 0:
+            self._tz = starttime.dt.tz
+        elif (starttime.dt.tz is None) != (self._tz is None):
+            raise ValueError(
+                f"starttime tz mismatch: book has {self._tz}, appended results have {starttime.dt.tz}"
+            )
+        if starttime.dt.tz is not None:
+            starttime = starttime.dt.tz_convert("UTC").dt.tz_localize(None)
+        return starttime.to_numpy(dtype="datetime64[ns]")
+
+    def append_results(self, results: Results) -> None:
+        """試合結果を追加. resultsには``ResultBook.from_results``と同じものを指定できる
+
+        starttimeのタイムゾーンの有無が最初に追加した結果と異なる場合はValueError
+        """
+        games = to_games_frame(results)
+        if len(games) == 0:
+            return
+        long = long_frame(games)
+        # 例外で中途半端に追加されないよう, プレイヤーを登録する前にstarttimeを検証する
+        starttime = self._to_utc(long["starttime"])
+        values = {
+            "game_id": long["game_id"].to_numpy() + self.n_games,
+            "player": self._encode(long["player"]),
+            "rank": long["rank"].to_numpy(),
+            "point": long["point"].to_numpy(),
+            "tip": long["tip"].to_numpy(),
+            "starttime": starttime,
+            "playernum": long["playernum"].to_numpy(),
+        }
+        start, end = self._size, self._size + len(long)
+        self._reserve(end)
+        for name, value in values.items():
+            self._columns[name][start:end] = value
+        self._size = end
+        self.n_games += len(games)
+
+        codes = values["player"]
+        np.add.at(self._times, codes, 1)
+        np.add.at(self._score_sum, codes, values["point"])
+        np.add.at(self._rank_sum, codes, values["rank"])
+        np.add.at(self._tip_sum, codes, np.nan_to_num(values["tip"]))
+        np.add.at(self._rank_counts, (codes, values["rank"] - 1), 1)
+
+    def aggregate(self, player_num: int, extra: bool = False, player_names: Optional[List[str]] = None) -> pd.DataFrame:
+        """集計を行う. 結果は``ResultBook.aggregate``と同じ形式
+
+        player_namesを指定するとそのプレイヤーだけを集計する. 省略時は登場した全プレイヤー
+        """
+        totals = {
+            "times": self._times,
+            "score_sum": self._score_sum,
+            "rank_sum": self._rank_sum,
+            "tip_sum": self._tip_sum,
+            "rank_counts": self._rank_counts,
+        }
+        names = player_names if player_names is not None else self._names
+        return summarize_players(names, self._codes, totals, player_num, extra)
+
+    def to_long(self) -> pd.DataFrame:
+        """縦持ちのDataFrame(``long_frame``を参照)に変換"""
+        columns = {name: column[: self._size] for (name, column) in self._columns.items()}
+        starttime = pd.Series(columns["starttime"])
+        if self._tz is not None:
+            starttime = starttime.dt.tz_localize("UTC").dt.tz_convert(self._tz)
+        return pd.DataFrame(
+            {
+                "game_id": columns["game_id"],
+                "player": np.array(self._names, dtype=object)[columns["player"]],
+                "rank": columns["rank"].astype(int),
+                "point": columns["point"],
+                "tip": columns["tip"],
+                "starttime": starttime,
+                "playernum": columns["playernum"],
+            }
+        )
+
+    def to_book(self, player_names: Optional[List[str]] = None) -> ResultBook:
+        """ResultBookに変換. player_names省略時は登場した全プレイヤーが対象"""
+        return ResultBook.from_long(self.to_long(), player_names or self.player_names)
+
+    def to_compact(self, player_names: Optional[List[str]] = None) -> CompactResultBook:
+        """CompactResultBookに変換"""
+        return CompactResultBook.from_long(self.to_long(), player_names or self.player_names)
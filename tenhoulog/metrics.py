@@ -0,0 +1,155 @@
+import json
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+Hook = Callable[["StageRecord"], None]
+
+_hooks: List[Hook] = []
+# 実行中の段階
+_active: List["_Stage"] = []
+
+
+@dataclass
+class StageRecord:
+    """1回の処理段階の計測結果"""
+
+    stage: str  # 段階の名前(fetch, parse_raw, from_results, aggregateなど)
+    seconds: float  # 経過時間
+    rows: int = 0  # 処理した行(試合)数
+    nbytes: int = 0  # ダウンロードしたバイト数
+    # tracemallocで測った, 開始時からのメモリ確保量の増分のピーク.
+    # 計測していない場合, 他の段階と重なった場合, reset_peakの無いPython 3.8以前ではNone
+    peak_bytes: Optional[int] = None
+    error: Optional[str] = None  # 例外で終わった場合の例外の型名
+    labels: Dict[str, str] = field(default_factory=dict)
+    timestamp: float = 0.0  # 開始時刻(UNIX時間)
+
+
+class _NullStage:
+    """計測が無効なときの何もしない段階"""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullStage":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+    def add(self, rows: int = 0, nbytes: int = 0) -> None:
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, name: str, labels: Dict[str, str]):
+        self.record = StageRecord(name, 0.0, labels=labels)
+        self.overlapped = False
+        self._baseline: Optional[int] = None
+
+    def __enter__(self) -> "_Stage":
+        # ピークはプロセス全体で1つなので, 入れ子や並行して実行された段階のピークは区別できない
+        for other in _active:
+            other.overlapped = True
+        self.overlapped = bool(_active)
+        _active.append(self)
+        if tracemalloc.is_tracing() and hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+            self._baseline = tracemalloc.get_traced_memory()[0]
+        self.record.timestamp = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, *exc_info: Any) -> None:
+        self.record.seconds = time.perf_counter() - self._start
+        _active.remove(self)
+        if self._baseline is not None and tracemalloc.is_tracing() and not self.overlapped:
+            self.record.peak_bytes = max(tracemalloc.get_traced_memory()[1] - self._baseline, 0)
+        if exc_type is not None:
+            self.record.error = exc_type.__name__
+        for hook in list(_hooks):
+            hook(self.record)
+
+    def add(self, rows: int = 0, nbytes: int = 0) -> None:
+        """処理した行数とバイト数を加える"""
+        self.record.rows += rows
+        self.record.nbytes += nbytes
+
+
+def stage(name: str, **labels: str) -> Any:
+    """処理段階を計測するコンテキストマネージャ
+
+    ``add``で行数やバイト数を記録できる. フックが1つも無ければ共有の何もしないオブジェクトを返すので,
+    計測が無効の間のコストは関数呼び出し1回分だけ
+    """
+    if not _hooks:
+        return _NULL_STAGE
+    return _Stage(name, labels)
+
+
+def add_hook(hook: Hook) -> None:
+    """段階が終わるたびにStageRecordを受け取るコールバックを登録する"""
+    _hooks.append(hook)
+
+
+def remove_hook(hook: Hook) -> None:
+    _hooks.remove(hook)
+
+
+class Collector:
+    """有効にしている間の計測結果を集める
+
+    memory=Trueにするとtracemallocでピークメモリも測る. tracemallocは処理を遅くするので既定では無効.
+    ピークメモリはPython 3.9以降で, 他の段階と重ならずに実行された段階だけで測れる
+    """
+
+    def __init__(self, memory: bool = False):
+        self.memory = memory
+        self.records: List[StageRecord] = []
+        self._started_tracing = False
+
+    def __enter__(self) -> "Collector":
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        add_hook(self.records.append)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        remove_hook(self.records.append)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def to_json_lines(self) -> str:
+        """1行1レコードのJSON"""
+        return "".join(json.dumps(asdict(record), ensure_ascii=False) + "\n" for record in self.records)
+
+    def to_prometheus(self, prefix: str = "tenhoulog") -> str:
+        """段階ごとに集計したPrometheusのテキスト形式"""
+        totals: Dict[str, Dict[str, float]] = {}
+        for record in self.records:
+            total = totals.setdefault(record.stage, {"count": 0, "seconds": 0.0, "rows": 0, "bytes": 0, "peak": 0})
+            total["count"] += 1
+            total["seconds"] += record.seconds
+            total["rows"] += record.rows
+            total["bytes"] += record.nbytes
+            total["peak"] = max(total["peak"], record.peak_bytes or 0)
+        metrics = [
+            ("stage_calls_total", "counter", "count", "Number of times the stage ran."),
+            ("stage_seconds_total", "counter", "seconds", "Wall time spent in the stage."),
+            ("stage_rows_total", "counter", "rows", "Rows processed by the stage."),
+            ("stage_bytes_total", "counter", "bytes", "Bytes downloaded by the stage."),
+            ("stage_peak_memory_bytes", "gauge", "peak", "Peak traced memory during the stage."),
+        ]
+        lines = []
+        for name, kind, key, help_text in metrics:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for stage_name, total in totals.items():
+                lines.append(f'{prefix}_{name}{{stage="{stage_name}"}} {total[key]}')
+        return "\n".join(lines) + "\n"
@@ -1,14 +1,20 @@
+import json
 import re
-from dataclasses import dataclass
-from datetime import datetime, date
-from typing import Any, Dict, List, Set, Tuple, Optional
-
-import japanize_matplotlib  # noqa
-import pandas as pd
-from matplotlib import pyplot as plt
-from matplotlib.figure import Figure
+from datetime import date, datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional
+
 from pydantic import BaseModel
 
+from .metrics import stage
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from .book import ResultBook  # noqa: F401
+
+# 天鳳のログの時刻のタイムゾーン
+JST = timezone(timedelta(hours=9))
+
 
 class GameResult(BaseModel):
     """1試合の結果
@@ -33,24 +39,21 @@ class GameResult(BaseModel):
     starttime: datetime  # 開始時刻
 
     def to_records(self) -> List["Record"]:
-        rank_to_attrs = [(rank, f"player{rank}") for rank in range(1, self.playernum + 1)]
         return [
             Record(
-                player_name=getattr(self, attr),
-                point=getattr(self, attr + "ptr"),
-                tip=getattr(self, attr + "shuugi"),
+                player_name=getattr(self, name),
+                point=getattr(self, point),
+                tip=getattr(self, tip),
                 rank=rank,
             )
-            for (rank, attr) in rank_to_attrs
+            for (rank, (name, point, tip)) in enumerate(_RANK_ATTRS[: self.playernum], 1)
         ]
 
-    @classmethod
-    def from_str(cls, log_oneline: str, date: date) -> "GameResult":
-        """天鳳公式の文字列形式の1行分をパース
+    @staticmethod
+    def parse_fields(log_oneline: str, date: date) -> Dict[str, Any]:
+        """天鳳公式の文字列形式の1行分を, GameResultのフィールドの辞書にパース
 
-        文字列形式の例:
-            L1000 | 00:30 | 四般南喰赤－ | A(+45.0) B(+9.0) C(-20.0) D(-34.0)
-            C1000 | 00:50 | 三般南喰赤祝 | A(+64.0,+3枚) B(-8.0,-1枚) C(-56.0,-2枚)
+        モデルの生成と検証を行わないため, 大量の行を読み込む場合はこちらの方が速い
         """
         data: Dict[str, Any] = {}
         lobby_id, starttime, rule, records_str = log_oneline.split("|")
@@ -61,12 +64,21 @@ class GameResult(BaseModel):
             data["playernum"] = 4
         else:
             data["playernum"] = 3
-        records = Record.parse_str(records_str.strip())
-        for record in records:
-            data[f"player{record.rank}"] = record.player_name
-            data[f"player{record.rank}ptr"] = record.point
-            data[f"player{record.rank}shuugi"] = record.tip
-        return cls(**data)
+        for rank, d in enumerate(Record.parse_record_dicts(records_str.strip()), 1):
+            data[f"player{rank}"] = d["name"]
+            data[f"player{rank}ptr"] = d["point"]
+            data[f"player{rank}shuugi"] = d["tip"]
+        return data
+
+    @classmethod
+    def from_str(cls, log_oneline: str, date: date) -> "GameResult":
+        """天鳳公式の文字列形式の1行分をパース
+
+        文字列形式の例:
+            L1000 | 00:30 | 四般南喰赤－ | A(+45.0) B(+9.0) C(-20.0) D(-34.0)
+            C1000 | 00:50 | 三般南喰赤祝 | A(+64.0,+3枚) B(-8.0,-1枚) C(-56.0,-2枚)
+        """
+        return cls(**cls.parse_fields(log_oneline, date))
 
     @classmethod
     def parse_str(cls, log_str: str, date: date) -> List["GameResult"]:
@@ -74,7 +86,51 @@ class GameResult(BaseModel):
         return [cls.from_str(log_oneline, date) for log_oneline in log_str.split("\n") if log_oneline]
 
     def player_names(self) -> List[str]:
-        return [getattr(self, f"player{i}") for i in range(1, self.playernum + 1)]
+        return [getattr(self, name) for (name, _, _) in _RANK_ATTRS[: self.playernum]]
+
+
+# 順位ごとの(名前, 得点, 祝儀)の属性名
+_RANK_ATTRS = [(f"player{rank}", f"player{rank}ptr", f"player{rank}shuugi") for rank in range(1, 5)]
+
+
+class GameTuple(NamedTuple):
+    """1試合の結果を保持する軽量なタプル
+
+    フィールドはGameResultと同じ. 検証を行わず, インスタンスごとの``__dict__``も持たないため,
+    大量の試合をメモリ上に保持する場合に使う
+    """
+
+    lobby: Optional[str]
+    playernum: int
+    player1: str
+    player1ptr: float
+    player1shuugi: Optional[int]
+    player2: str
+    player2ptr: float
+    player2shuugi: Optional[int]
+    player3: str
+    player3ptr: float
+    player3shuugi: Optional[int]
+    player4: Optional[str]
+    player4ptr: Optional[float]
+    player4shuugi: Optional[int]
+    starttime: datetime
+
+    def player_names(self) -> List[str]:
+        return [getattr(self, name) for (name, _, _) in _RANK_ATTRS[: self.playernum]]
+
+    def to_records(self) -> List["Record"]:
+        return [
+            Record(player_name=getattr(self, name), point=getattr(self, point), tip=getattr(self, tip), rank=rank)
+            for (rank, (name, point, tip)) in enumerate(_RANK_ATTRS[: self.playernum], 1)
+        ]
+
+    @classmethod
+    def from_model(cls, result: GameResult) -> "GameTuple":
+        return cls(**result.__dict__)
+
+    def to_model(self) -> GameResult:
+        return GameResult(**self._asdict())
 
 
 class APIResponse(BaseModel):
@@ -84,6 +140,26 @@ class APIResponse(BaseModel):
     lobby: Optional[str]  # 個室ID
     list: List[GameResult]
 
+    @classmethod
+    def parse_columns(cls, text: str, validate: bool = False) -> "pd.DataFrame":
+        """レスポンスを1試合1行のDataFrameとしてパース
+
+        試合ごとのGameResultを生成しないため, parse_rawより高速かつ省メモリ.
+        validateを指定するとparse_rawと同じ検証を行ってから変換する
+        """
+        from .book import games_frame
+
+        with stage("parse_columns") as s:
+            if validate:
+                df = games_frame([result.dict() for result in cls.parse_raw(text).list])
+            else:
+                df = games_frame(json.loads(text)["list"])
+            s.add(rows=len(df))
+        return df
+
+
+_RECORD_PATTERN = re.compile(r"(?P<name>[^\s\(\)]+)\((?P<scores>[\d\+\-\.,]+).*\)")
+
 
 class Record(BaseModel):
     """プレイヤーの1試合分の成績"""
@@ -102,8 +178,7 @@ class Record(BaseModel):
             >>> parse_record_str("A(+45.0,+3枚)")
             {"name": "A", "point": 45.0, "tip": 3}
         """
-        regex = re.compile(r"(?P<name>[^\s\(\)]+)\((?P<scores>[\d\+\-\.,]+).*\)")
-        m = regex.match(record_str)
+        m = _RECORD_PATTERN.match(record_str)
         if m is None:
             raise ValueError(f"Invalid record_str format: {record_str}")
         score, *tail = m["scores"].split(",")
@@ -124,97 +199,21 @@ class Record(BaseModel):
             >>> from_str("A(+64.0,+3枚) B(-8.0,-1枚) C(-56.0,-2枚)")
             [Record("A", 64.0, 3, 1), Record("B", -8.0, -1, 2), Record("C", -56.0, -2, 3)]
         """
-        ds = sorted(
-            [cls._parse_record_str(record_str) for record_str in records_str.split(" ")], key=lambda x: -x["point"]
-        )
+        ds = cls.parse_record_dicts(records_str)
         return [Record(player_name=d["name"], point=d["point"], tip=d["tip"], rank=i + 1) for (i, d) in enumerate(ds)]
 
-
-@dataclass
-class ResultBook:
-    """複数試合の結果をまとめた帳簿"""
-
-    scores: pd.DataFrame  # 得点
-    ranks: pd.DataFrame  # 順位
-    tips: pd.DataFrame  # 祝儀
-
-    @property
-    def player_names(self) -> Set[str]:
-        return set(self.scores.columns) - {"starttime"}
-
-    def __add__(self, other: "ResultBook") -> "ResultBook":
-        """他のBookとの結合"""
-        columns = self.player_names.union(other.player_names).union({"starttime"})
-        base_df = pd.DataFrame([], columns=columns)
-        return ResultBook(
-            pd.concat([base_df, self.scores, other.scores]),
-            pd.concat([base_df, self.ranks, other.ranks]),
-            pd.concat([base_df, self.tips, other.tips]),
-        )
-
     @classmethod
-    def _filter_df_by_period(cls, df: pd.DataFrame, time_period: Tuple[datetime, datetime]) -> pd.DataFrame:
-        return df[(time_period[0] <= df["starttime"]) & (df["starttime"] < time_period[1])]
-
-    def filter_by_period(self, time_period: Tuple[datetime, datetime]) -> "ResultBook":
-        """指定した期間内の結果にフィルタする"""
-        return ResultBook(
-            self._filter_df_by_period(self.scores, time_period),
-            self._filter_df_by_period(self.ranks, time_period),
-            self._filter_df_by_period(self.tips, time_period),
+    def parse_record_dicts(cls, records_str: str) -> List[Dict[str, Any]]:
+        """天鳳公式の文字列形式を, 順位順に並べた``_parse_record_str``の結果のリストにパース"""
+        return sorted(
+            [cls._parse_record_str(record_str) for record_str in records_str.split(" ")], key=lambda x: -x["point"]
         )
 
-    def aggregate(self, player_num: int) -> pd.DataFrame:
-        """集計を行う"""
-        rows = []
-        for player in self.player_names:
-            score_sum = self.scores[player].sum()
-            times = self.scores[player].notnull().sum()
-            rank_counts = self.ranks[player].value_counts().to_dict()
-            ranks = [rank_counts.get(rank, 0) for rank in range(1, player_num + 1)]
-            rank_avg = self.ranks[player].mean()
-            tip = int(self.tips[player].sum())
-            rows.append([player, times, score_sum, "-".join(map(str, ranks)), rank_avg, tip])
-        return pd.DataFrame(rows, columns=["名前", "回数", "得点", "順位分布", "平均順位", "祝儀"])
-
-    def plot_cumsum(self, attr: str = "scores") -> Figure:
-        """得点または祝儀の推移を可視化
-
-        Args:
-            - attr (str): ``scores`` or ``tips``を選択. Default to ``scores``.
-        """
-        target_df: pd.DataFrame = getattr(self, attr)
-        fig, ax = plt.subplots()
-        shifted_cumsum = target_df[self.player_names].apply(lambda x: pd.Series(x.dropna().values)).cumsum()
-        shifted_cumsum.plot(ax=ax)
-        ax.set_title("得点推移")
-        ax.legend(loc="upper left")
-        return fig
 
-    @classmethod
-    def from_results(cls, results: List["GameResult"], player_names: List[str]) -> "ResultBook":
-        """試合結果をDataFrameに変換
+# ResultBookはpandasを使うため.bookに移動した. 互換性のためmodelsからも参照できるようにしておく
+def __getattr__(name: str) -> Any:
+    if name == "ResultBook":
+        from . import book
 
-        player_namesで指定したプレイヤーの結果だけが対象
-        (scoreを表すdf, rankを表すdf)を返す
-        """
-        scores = []
-        ranks = []
-        tips = []
-        columns = player_names + ["starttime"]
-        players = set(player_names)
-        for result in results:
-            if not (players & set(result.player_names())):
-                continue
-            records = result.to_records()
-            score = dict({record.player_name: record.point for record in records}, starttime=result.starttime)
-            rank = dict({record.player_name: record.rank for record in records}, starttime=result.starttime)
-            tip = dict({record.player_name: record.tip for record in records}, starttime=result.starttime)
-            scores.append(score)
-            ranks.append(rank)
-            tips.append(tip)
-        return ResultBook(
-            pd.DataFrame(scores, columns=columns),
-            pd.DataFrame(ranks, columns=columns),
-            pd.DataFrame(tips, columns=columns),
-        )
+        return book.ResultBook
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,135 @@
+import warnings
+from pathlib import Path
+from types import ModuleType
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+
+
+def pyplot() -> ModuleType:
+    """日本語フォントを設定したmatplotlib.pyplotを返す
+
+    matplotlibの読み込みには時間がかかるため, 描画するときに初めて読み込む
+    """
+    import japanize_matplotlib  # noqa
+    from matplotlib import pyplot as plt
+
+    return plt
+
+
+# 凡例を表示する最大の系列数
+LEGEND_LIMIT = 20
+
+
+def select_columns(table: pd.DataFrame, top_n: Optional[int] = None, highlight: Sequence[str] = ()) -> List[str]:
+    """最終値の大きい上位top_n列とhighlightの列を, tableの列の順に返す. top_n省略時は全列"""
+    if top_n is None:
+        return list(table.columns)
+    last = table.ffill().iloc[-1] if len(table) else pd.Series(dtype=float)
+    selected = set(last.nlargest(top_n).index) | set(highlight)
+    return [column for column in table.columns if column in selected]
+
+
+def lttb(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Bucketsで間引く点の行番号
+
+    yは(点数 x 系列数)の配列で, xは行番号とする. バケットは全系列で共通なので
+    バケットごとに全系列をまとめて処理する. 末尾の欠損の後ろのバケットでは欠損の点を選ぶ
+
+    Returns:
+        (n_out x 系列数)の行番号
+    """
+    n, m = y.shape
+    if n <= n_out or n_out < 3:
+        return np.repeat(np.arange(n)[:, None], m, axis=1)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty((n_out, m), dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    columns = np.arange(m)
+    a = np.zeros(m, dtype=np.int64)
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # 全て欠損のバケット
+            next_x = (end + next_end - 1) / 2
+            next_y = np.nanmean(y[end:next_end], axis=0)
+        x_a, y_a = a.astype(float), y[a, columns]
+        bucket_x = np.arange(start, end, dtype=float)[:, None]
+        area = np.abs((x_a - next_x) * (y[start:end] - y_a) - (x_a - bucket_x) * (next_y - y_a))
+        a = start + np.argmax(np.nan_to_num(area, nan=-1.0), axis=0)
+        selected[i + 1] = a
+    return selected
+
+
+def plot_lines(
+    table: pd.DataFrame,
+    title: str = "",
+    top_n: Optional[int] = None,
+    highlight: Sequence[str] = (),
+    downsample: bool = True,
+    path: Optional[Union[str, Path]] = None,
+    figsize: Tuple[float, float] = (6.4, 4.8),
+    dpi: int = 100,
+) -> "Figure":
+    """各列を1本の線として1つのLineCollectionで描画する
+
+    pyplotを使わずAggで描画するため, 系列が多くてもサーバーなどから高速に画像を作れる
+
+    Args:
+        - table (pd.DataFrame): 行番号をx, 各列を系列とする表. 欠損の点は描画しない
+        - top_n (int, optional): 最終値の大きい上位top_n系列だけを描画する
+        - highlight (Sequence[str]): 色を付けて描画する系列. 指定すると他の系列は灰色になる
+        - downsample (bool): 各系列を図の横幅のピクセル数までLTTBで間引く
+        - path (str or Path, optional): 指定するとその画像ファイルに保存する
+    """
+    import japanize_matplotlib  # noqa
+    from matplotlib import rcParams
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.collections import LineCollection
+    from matplotlib.figure import Figure
+    from matplotlib.lines import Line2D
+
+    columns = select_columns(table, top_n, highlight)
+    y = table[columns].to_numpy(dtype=float)
+    if downsample:
+        rows = lttb(y, int(figsize[0] * dpi))
+    else:
+        rows = np.repeat(np.arange(len(y))[:, None], len(columns), axis=1)
+    x = table.index.to_numpy(dtype=float)
+
+    cycle = rcParams["axes.prop_cycle"].by_key()["color"]
+    segments, colors, widths = [], [], []
+    labels: Dict[str, str] = {}
+    for j, column in enumerate(columns):
+        values = y[:, j]
+        valid = np.flatnonzero(~np.isnan(values))
+        if len(valid) == 0:
+            continue
+        index = np.unique(np.append(rows[:, j][~np.isnan(values[rows[:, j]])], valid[-1]))
+        segments.append(np.column_stack([x[index], values[index]]))
+        if highlight and column not in highlight:
+            colors.append("lightgray")
+            widths.append(0.8)
+        else:
+            colors.append(cycle[len(labels) % len(cycle)])
+            widths.append(2.0 if highlight else 1.5)
+            labels[column] = colors[-1]
+
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.add_collection(LineCollection(segments, colors=colors, linewidths=widths))
+    ax.autoscale_view()
+    ax.set_title(title)
+    if 0 < len(labels) <= LEGEND_LIMIT:
+        handles = [Line2D([], [], color=color, label=label) for (label, color) in labels.items()]
+        ax.legend(handles=handles, loc="upper left")
+    if path is not None:
+        fig.savefig(path)
+    return fig
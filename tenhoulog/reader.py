@@ -0,0 +1,279 @@
+import gzip
+import io
+import logging
+import re
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
+
+import pandas as pd
+
+from .compact import CompactResultBook
+from .book import Results, ResultBook, games_frame_from_results, long_frame, to_games_frame
+from .models import GameResult
+
+logger = logging.getLogger(__name__)
+
+LogSource = Union[str, Path, IO[str], IO[bytes]]
+T = TypeVar("T")
+
+
+@dataclass
+class MalformedLine:
+    """パースできなかった行"""
+
+    lineno: int  # 行番号(1始まり)
+    line: str
+    error: str
+    path: Optional[str] = None  # ディレクトリから読み込んだ場合のファイルのパス
+
+
+@contextmanager
+def _open(source: LogSource) -> Iterator[IO[str]]:
+    """パスまたはファイルオブジェクトをテキストとして開く. 渡されたファイルオブジェクトは閉じない"""
+    if isinstance(source, (str, Path)):
+        if str(source).endswith(".gz"):
+            with gzip.open(source, "rt", encoding="utf-8") as f:
+                yield f
+        else:
+            with open(source, encoding="utf-8") as f:
+                yield f
+    elif isinstance(source.read(0), bytes):
+        wrapper = io.TextIOWrapper(source, encoding="utf-8")  # type: ignore
+        try:
+            yield wrapper
+        finally:
+            wrapper.detach()
+    else:
+        yield source  # type: ignore
+
+
+def _parse_line(line: str, date: date) -> Dict[str, Any]:
+    """``GameResult.parse_fields``に加え, 記録の数が人数と一致するかを検証する"""
+    fields = GameResult.parse_fields(line, date)
+    n_records = sum(f"player{rank}" in fields for rank in range(1, 5))
+    if n_records != fields["playernum"]:
+        raise ValueError(f"expected {fields['playernum']} records, got {n_records}")
+    return fields
+
+
+def _iter_parsed(
+    source: LogSource, date: date, parse: Callable[[str, date], T], errors: Optional[List[MalformedLine]]
+) -> Iterator[T]:
+    """ログを1行ずつparseで変換する. 変換できなかった行はerrorsに追加するか警告を出して読み飛ばす"""
+    with _open(source) as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if line.endswith("<br>"):
+                line = line[: -len("<br>")].rstrip()
+            if not line:
+                continue
+            try:
+                yield parse(line, date)
+            except ValueError as e:
+                if errors is None:
+                    logger.warning("skip malformed line %d: %s (%s)", lineno, line, e)
+                else:
+                    errors.append(MalformedLine(lineno, line, str(e)))
+
+
+def _parse_model(line: str, date: date) -> GameResult:
+    return GameResult(**_parse_line(line, date))
+
+
+def iter_fields(
+    source: LogSource, date: date, errors: Optional[List[MalformedLine]] = None
+) -> Iterator[Dict[str, Any]]:
+    """天鳳公式の文字列形式のログを1行ずつパースし, GameResultのフィールドの辞書を返す
+
+    Args:
+        - source: ファイルのパス(``.gz``ならgzipとして読む)またはファイルオブジェクト
+        - date (date): ログの日付
+        - errors (List[MalformedLine], optional): パースできなかった行の追加先.
+          省略した場合はloggingで警告を出す. いずれの場合も読み込みは継続する
+    """
+    return _iter_parsed(source, date, _parse_line, errors)
+
+
+def iter_batches(
+    source: LogSource,
+    date: date,
+    batch_size: int = 10000,
+    as_frame: bool = False,
+    errors: Optional[List[MalformedLine]] = None,
+) -> Iterator[Union[List[GameResult], pd.DataFrame]]:
+    """ログをbatch_size試合ずつのバッチとして読み込む
+
+    as_frameを指定するとGameResultを生成せず, 1試合1行のDataFrameを返す.
+    GameResultの検証に失敗した行もerrorsに追加して読み飛ばす. その他の引数は``iter_fields``と同様
+    """
+    items: Iterator[Any] = _iter_parsed(source, date, _parse_line if as_frame else _parse_model, errors)
+    batch: List[Any] = []
+
+    def flush() -> Union[List[GameResult], pd.DataFrame]:
+        if as_frame:
+            return pd.DataFrame(batch, columns=list(GameResult.__fields__))
+        return batch
+
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield flush()
+            batch = []
+    if batch:
+        yield flush()
+
+
+class ResultBookBuilder:
+    """バッチごとに試合結果を受け取ってResultBookを組み立てる
+
+    player_namesを指定すると, 受け取った時点で対象プレイヤー以外の結果を捨てる
+    """
+
+    def __init__(self, player_names: Optional[List[str]] = None):
+        self.player_names = player_names
+        self.n_games = 0
+        self._chunks: List[pd.DataFrame] = []
+
+    def add(self, results: Results) -> None:
+        """試合結果のバッチを追加"""
+        games = to_games_frame(results)
+        self.add_long(long_frame(games), len(games))
+
+    def add_long(self, long: pd.DataFrame, n_games: int) -> None:
+        """``long_frame``の形式で変換済みのn_games試合分の結果を追加"""
+        if self.player_names is not None:
+            long = long[long["player"].isin(self.player_names)]
+        self._chunks.append(long.assign(game_id=long["game_id"] + self.n_games))
+        self.n_games += n_games
+
+    def long(self) -> pd.DataFrame:
+        """これまでに追加した結果の縦持ちのDataFrame"""
+        if not self._chunks:
+            return long_frame(games_frame_from_results([]))
+        return pd.concat(self._chunks, ignore_index=True)
+
+    def build(self, player_names: Optional[List[str]] = None) -> ResultBook:
+        """ResultBookを生成. player_names省略時はコンストラクタで指定したプレイヤーが対象"""
+        player_names = player_names or self.player_names
+        if player_names is None:
+            raise ValueError("player_names is required")
+        return ResultBook.from_long(self.long(), player_names)
+
+    def build_compact(self, player_names: Optional[List[str]] = None) -> CompactResultBook:
+        """CompactResultBookを生成"""
+        return CompactResultBook.from_long(self.long(), player_names or self.player_names)
+
+
+def read_book(
+    source: LogSource,
+    date: date,
+    player_names: List[str],
+    batch_size: int = 10000,
+    errors: Optional[List[MalformedLine]] = None,
+) -> ResultBook:
+    """ログを読み込みながらResultBookを生成"""
+    builder = ResultBookBuilder(player_names)
+    for batch in iter_batches(source, date, batch_size, as_frame=True, errors=errors):
+        builder.add(batch)
+    return builder.build()
+
+
+_DATE_PATTERN = re.compile(r"(\d{4})(\d{2})(\d{2})")
+
+
+def date_from_filename(path: Union[str, Path]) -> Optional[date]:
+    """ファイル名に含まれるYYYYMMDDから日付を取得. 含まれない場合はNone
+
+    Examples:
+        >>> date_from_filename("scc20200815.html.gz")
+        datetime.date(2020, 8, 15)
+    """
+    m = _DATE_PATTERN.search(Path(path).name)
+    if m is None:
+        return None
+    try:
+        return date(int(m[1]), int(m[2]), int(m[3]))
+    except ValueError:
+        return None
+
+
+def list_log_files(directory: Union[str, Path], pattern: str = "*") -> List[Tuple[date, Path]]:
+    """ディレクトリ内の日別ログを(日付, パス)の日付順のリストにする. 日付の無いファイルは無視する"""
+    files = []
+    for path in Path(directory).glob(pattern):
+        log_date = date_from_filename(path)
+        if path.is_file() and log_date is not None:
+            files.append((log_date, path))
+    return sorted(files)
+
+
+def _read_log_file(
+    args: Tuple[date, Path, Optional[List[str]]]
+) -> Tuple[pd.DataFrame, int, List[MalformedLine]]:
+    """1ファイル分を縦持ちのDataFrameに変換. プロセスプールのworkerで実行される"""
+    log_date, path, player_names = args
+    errors: List[MalformedLine] = []
+    games = pd.concat(
+        list(iter_batches(path, log_date, as_frame=True, errors=errors))
+        or [games_frame_from_results([])],
+        ignore_index=True,
+    )
+    long = long_frame(games)
+    if player_names is not None:
+        long = long[long["player"].isin(player_names)]
+    for error in errors:
+        error.path = str(path)
+    return long, len(games), errors
+
+
+def read_log_dir(
+    directory: Union[str, Path],
+    player_names: Optional[List[str]] = None,
+    processes: Optional[int] = None,
+    pattern: str = "*",
+    errors: Optional[List[MalformedLine]] = None,
+) -> ResultBookBuilder:
+    """ディレクトリ内の日別ログをプロセスプールで並列に読み込む
+
+    日付はファイル名から推測する. 結果は並列度によらず日付順に結合される
+
+    Args:
+        - directory: 日別ログのディレクトリ
+        - player_names (List[str], optional): 対象のプレイヤー. 省略時は全員
+        - processes (int, optional): プロセス数. 省略時はCPU数, 1ならプールを使わない
+        - pattern (str): 対象とするファイルのglobパターン
+        - errors (List[MalformedLine], optional): パースできなかった行の追加先
+
+    Returns:
+        読み込んだ結果を持つResultBookBuilder
+    """
+    tasks = [(log_date, path, player_names) for (log_date, path) in list_log_files(directory, pattern)]
+    builder = ResultBookBuilder(player_names)
+    if processes == 1:
+        outputs: Iterable[Tuple[pd.DataFrame, int, List[MalformedLine]]] = map(_read_log_file, tasks)
+        for long, n_games, file_errors in outputs:
+            _collect(builder, long, n_games, file_errors, errors)
+    else:
+        with ProcessPoolExecutor(processes) as executor:
+            for long, n_games, file_errors in executor.map(_read_log_file, tasks):
+                _collect(builder, long, n_games, file_errors, errors)
+    return builder
+
+
+def _collect(
+    builder: ResultBookBuilder,
+    long: pd.DataFrame,
+    n_games: int,
+    file_errors: List[MalformedLine],
+    errors: Optional[List[MalformedLine]],
+) -> None:
+    builder.add_long(long, n_games)
+    for error in file_errors:
+        if errors is None:
+            logger.warning("skip malformed line %s:%d: %s (%s)", error.path, error.lineno, error.line, error.error)
+        else:
+            errors.append(error)
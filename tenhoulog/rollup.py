@@ -0,0 +1,151 @@
+from datetime import datetime, tzinfo
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .book import MAX_RANK, Results, long_frame, summarize_players, to_games_frame
+from .models import JST
+
+# 日ごとに保持する部分和. rank_countsは(日数, プレイヤー数, MAX_RANK)
+_FIELDS = ["times", "score_sum", "rank_sum", "tip_sum", "rank_counts"]
+
+
+class DailyRollup:
+    """プレイヤーごと・日ごとの部分和
+
+    日ごとの回数, 得点・順位・祝儀の合計, 順位分布と, それらの日方向の累積和を持つ.
+    期間の集計は期間の両端の累積和の差で求まるため, 試合数によらずプレイヤー数に比例する時間で返る.
+    日の区切りはtz(既定は日本時間)での0時. タイムゾーンの無い時刻はtzでの時刻とみなす
+    """
+
+    def __init__(self, player_names: Optional[List[str]] = None, tz: tzinfo = JST):
+        self.days = np.zeros(0, dtype="datetime64[D]")
+        self.tz = tz
+        self._players: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self._partials = {field: self._zeros(field, 0, 0) for field in _FIELDS}
+        self._prefix = {field: self._zeros(field, 1, 0) for field in _FIELDS}
+        self._add_players(player_names or [])
+
+    @staticmethod
+    def _zeros(field: str, n_days: int, n_players: int) -> np.ndarray:
+        if field == "rank_counts":
+            return np.zeros((n_days, n_players, MAX_RANK), dtype=np.int64)
+        return np.zeros((n_days, n_players), dtype=np.int64 if field == "times" else float)
+
+    @property
+    def players(self) -> List[str]:
+        """集計対象のプレイヤー名"""
+        return list(self._players)
+
+    @classmethod
+    def from_long(
+        cls, long: pd.DataFrame, player_names: Optional[List[str]] = None, tz: tzinfo = JST
+    ) -> "DailyRollup":
+        """縦持ちのDataFrame(``long_frame``を参照)から生成. player_names省略時は登場した全プレイヤー"""
+        rollup = cls(player_names, tz)
+        rollup.add_long(long, add_players=player_names is None)
+        return rollup
+
+    def add_results(self, results: Results) -> None:
+        """試合結果を追加. resultsには``ResultBook.from_results``と同じものを指定できる"""
+        self.add_long(long_frame(to_games_frame(results)))
+
+    def add_long(self, long: pd.DataFrame, add_players: bool = True) -> None:
+        """縦持ちの結果を追加
+
+        追加された日以降の累積和だけを更新する. add_players=Falseの場合, 未知のプレイヤーの結果は無視する
+        """
+        long = long[long["point"].notnull()]
+        if add_players:
+            self._add_players(pd.unique(long["player"]))
+        codes = long["player"].map(self._codes)
+        long = long[codes.notnull()]
+        if len(long) == 0:
+            return
+        codes = codes[codes.notnull()].to_numpy(dtype=np.int64)
+
+        days = self._local_days(long["starttime"])
+        new_days = np.union1d(self.days, days)
+        if len(new_days) > len(self.days):
+            positions = np.searchsorted(new_days, self.days)
+            for field in _FIELDS:
+                partial = self._partials[field]
+                grown = self._zeros(field, len(new_days), partial.shape[1])
+                grown[positions] = partial
+                self._partials[field] = grown
+            self.days = new_days
+
+        rows = np.searchsorted(self.days, days)
+        rank = long["rank"].to_numpy().astype(np.int64)
+        np.add.at(self._partials["times"], (rows, codes), 1)
+        np.add.at(self._partials["score_sum"], (rows, codes), long["point"].to_numpy(dtype=float))
+        np.add.at(self._partials["rank_sum"], (rows, codes), rank)
+        np.add.at(self._partials["tip_sum"], (rows, codes), np.nan_to_num(long["tip"].astype(float).to_numpy()))
+        valid = (rank >= 1) & (rank <= MAX_RANK)
+        np.add.at(self._partials["rank_counts"], (rows[valid], codes[valid], rank[valid] - 1), 1)
+        self._update_prefix(int(rows.min()))
+
+    def _add_players(self, player_names: Any) -> None:
+        new = [name for name in player_names if name not in self._codes]
+        if not new:
+            return
+        for name in new:
+            self._codes[name] = len(self._players)
+            self._players.append(name)
+        for store in (self._partials, self._prefix):
+            for field, values in store.items():
+                padding = self._zeros(field, values.shape[0], len(new))
+                store[field] = np.concatenate([values, padding], axis=1)
+
+    def _update_prefix(self, start: int) -> None:
+        """start日目以降の累積和を再計算する"""
+        for field in _FIELDS:
+            partial = self._partials[field]
+            prefix = self._prefix[field]
+            if len(prefix) != len(partial) + 1:
+                grown = self._zeros(field, len(partial) + 1, partial.shape[1])
+                grown[: start + 1] = prefix[: start + 1]
+                prefix = grown
+            prefix[start + 1 :] = prefix[start] + np.cumsum(partial[start:], axis=0)
+            self._prefix[field] = prefix
+
+    def _local_days(self, starttime: pd.Series) -> np.ndarray:
+        """tzでの日付"""
+        starttime = pd.to_datetime(starttime)
+        if starttime.dt.tz is not None:
+            starttime = starttime.dt.tz_convert(self.tz).dt.tz_localize(None)
+        return starttime.to_numpy().astype("datetime64[D]")
+
+    def _day_position(self, t: datetime) -> int:
+        timestamp = pd.Timestamp(t)
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.tz_convert(self.tz).tz_localize(None)
+        if timestamp != timestamp.normalize():
+            raise ValueError(f"period must be aligned to the start of a day: {t}")
+        return int(np.searchsorted(self.days, np.datetime64(timestamp.date(), "D")))
+
+    def aggregate(
+        self,
+        player_num: int,
+        time_period: Optional[Tuple[datetime, datetime]] = None,
+        extra: bool = False,
+        player_names: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """期間内の集計. 結果は``ResultBook.filter_by_period(time_period).aggregate``と同じ
+
+        Args:
+            - player_num (int): 対戦人数. 順位分布の幅になる
+            - time_period (Tuple[datetime, datetime], optional): 集計する期間. 両端は日の始まりであること
+            - extra (bool): トップ率, ラス回避率, 平均得点の列を追加する
+            - player_names (List[str], optional): 集計するプレイヤー. 省略時は全プレイヤー
+        """
+        if time_period is None:
+            start, end = 0, len(self.days)
+        else:
+            start, end = (self._day_position(t) for t in time_period)
+            end = max(start, end)
+        totals = {field: prefix[end] - prefix[start] for (field, prefix) in self._prefix.items()}
+        names = player_names if player_names is not None else self._players
+        return summarize_players(names, self._codes, totals, player_num, extra)
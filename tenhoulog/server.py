@@ -0,0 +1,287 @@
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from io import BytesIO
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .book import ResultBook
+from .dedup import JST, merge_results
+from .io import LOBBY_API_URL, PLAYER_API_URL, FetchManyError, fetch_many_lobbies, fetch_many_players
+from .models import GameResult
+
+logger = logging.getLogger(__name__)
+
+# (ステータス, Content-Type, 本文)
+Response = Tuple[int, str, bytes]
+Handler = Callable[[str, str, bytes], Awaitable[Response]]
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def json_response(data: object, status: int = 200) -> Response:
+    return status, "application/json; charset=utf-8", json.dumps(data, ensure_ascii=False).encode()
+
+
+async def _handle_connection(handler: Handler, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """1接続で1リクエストだけを処理する最小限のHTTP/1.1"""
+    try:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+        if len(request_line) != 3:
+            status, content_type, payload = json_response({"error": "malformed request"}, 400)
+        else:
+            try:
+                status, content_type, payload = await handler(request_line[0], request_line[1], body)
+            except HTTPError as e:
+                status, content_type, payload = json_response({"error": str(e)}, e.status)
+            except Exception as e:
+                logger.exception("failed to handle %s", request_line[1])
+                status, content_type, payload = json_response({"error": repr(e)}, 500)
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\nContent-Length: {len(payload)}\r\nConnection: close\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + payload)
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_http(handler: Handler, host: str, port: int) -> asyncio.AbstractServer:
+    """handler(method, target, body)でリクエストを処理するHTTPサーバーを起動する"""
+    return await asyncio.start_server(lambda r, w: _handle_connection(handler, r, w), host, port)
+
+
+@dataclass
+class BookSource:
+    """帳簿の取得元
+
+    kindが``lobby``ならkeysのロビーの, ``players``ならkeysのプレイヤーの対戦成績から帳簿を作る.
+    player_namesを省略すると, lobbyでは登場した全プレイヤー, playersではkeysのプレイヤーが集計対象
+    """
+
+    name: str
+    kind: str
+    keys: List[str]
+    player_names: Optional[List[str]] = None
+
+
+class BookServer:
+    """ResultBookをメモリに保持し, 集計や推移の図を返すHTTPサーバー
+
+    帳簿はrefresh_interval秒ごとにバックグラウンドで取得し直す.
+    応答はクエリごとにキャッシュし, 帳簿を取得し直したときにその帳簿のキャッシュを破棄する
+
+    エンドポイント:
+        - ``GET /books``: 帳簿の一覧
+        - ``GET /aggregate?book=名前&player_num=4[&start=...&end=...&extra=1]``: 集計(JSON)
+        - ``GET /plot?book=名前[&start=...&end=...&top_n=20&highlight=A,B]``: 得点推移(PNG)
+        - ``POST /refresh[?book=名前]``: 直ちに取得し直す
+    startとendはISO 8601形式で, タイムゾーンが無ければ日本時間とみなす
+    """
+
+    def __init__(
+        self,
+        sources: List[BookSource],
+        refresh_interval: float = 600.0,
+        lobby_url: str = LOBBY_API_URL,
+        player_url: str = PLAYER_API_URL,
+    ):
+        self.sources = {source.name: source for source in sources}
+        self.refresh_interval = refresh_interval
+        self.lobby_url = lobby_url
+        self.player_url = player_url
+        self.books: Dict[str, ResultBook] = {}
+        self.refreshed_at: Dict[str, float] = {}
+        self.cache_hits = 0
+        self._cache: Dict[str, Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Response]] = {}
+        self._refresh_task: Optional["asyncio.Task[None]"] = None
+
+    async def refresh(self, name: Optional[str] = None) -> None:
+        """帳簿を取得し直す. name省略時は全ての帳簿"""
+        names = [name] if name is not None else list(self.sources)
+        for book_name in names:
+            source = self.sources[book_name]
+            try:
+                if source.kind == "lobby":
+                    fetched = await fetch_many_lobbies(source.keys, url=self.lobby_url)
+                else:
+                    fetched = await fetch_many_players(source.keys, url=self.player_url)
+            except FetchManyError as e:
+                # 1件も取れなければ前回の帳簿を残す. 一部だけなら取得できた分で帳簿を作る
+                if not e.results:
+                    raise
+                logger.warning("partially refreshed %s: %s", book_name, e)
+                fetched = e.results
+            if source.kind == "lobby":
+                player_names = source.player_names
+            else:
+                player_names = source.player_names or source.keys
+            loop = asyncio.get_event_loop()
+            book = await loop.run_in_executor(None, _build_book, fetched, player_names)
+            self.books[book_name] = book
+            self.refreshed_at[book_name] = time.time()
+            self._cache[book_name] = {}
+            logger.info("refreshed %s: %d games", book_name, len(book.scores))
+
+    async def _refresh_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("failed to refresh books")
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8000) -> asyncio.AbstractServer:
+        """帳簿を取得してからサーバーを起動し, 定期的な取得を始める"""
+        await self.refresh()
+        server = await start_http(self.handle, host, port)
+        self._refresh_task = asyncio.ensure_future(self._refresh_forever())
+        return server
+
+    def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+
+    async def handle(self, method: str, target: str, body: bytes) -> Response:
+        url = urlsplit(target)
+        params = {key: values[-1] for (key, values) in parse_qs(url.query).items()}
+        if url.path == "/books" and method == "GET":
+            return json_response(
+                [
+                    {"name": name, "games": len(book.scores), "refreshed_at": self.refreshed_at[name]}
+                    for (name, book) in self.books.items()
+                ]
+            )
+        if url.path == "/refresh" and method == "POST":
+            name = params.get("book")
+            if name is not None and name not in self.sources:
+                raise HTTPError(404, f"unknown book: {name}")
+            await self.refresh(name)
+            return json_response({"refreshed": [name] if name else list(self.sources)})
+        if url.path in ("/aggregate", "/plot"):
+            if method != "GET":
+                raise HTTPError(405, f"{method} is not allowed")
+            name = params.get("book", "")
+            book = self.books.get(name)
+            if book is None:
+                raise HTTPError(404, f"unknown book: {name}")
+            key = (url.path, tuple(sorted(params.items())))
+            cache = self._cache[name]
+            if key in cache:
+                self.cache_hits += 1
+                return cache[key]
+            render = _aggregate if url.path == "/aggregate" else _plot
+            loop = asyncio.get_event_loop()
+            response = await loop.run_in_executor(None, render, book, params)
+            # 描画中に取得し直した場合は古い結果をキャッシュしない
+            if self.books.get(name) is book:
+                cache[key] = response
+            return response
+        raise HTTPError(404, f"not found: {url.path}")
+
+
+def _build_book(fetched: Dict[str, List[GameResult]], player_names: Optional[List[str]]) -> ResultBook:
+    games, _ = merge_results(fetched)
+    if player_names is None:
+        columns = [games[f"player{rank}"] for rank in range(1, 5)]
+        player_names = list(dict.fromkeys(name for column in columns for name in column if isinstance(name, str)))
+    return ResultBook.from_results(games, player_names)
+
+
+# pd.Timestampで表せる範囲に収まる期間の端点. 古いpandasでは範囲外の時刻はOutOfBoundsDatetimeになる
+MIN_TIME = datetime(1677, 9, 22, tzinfo=timezone.utc)
+MAX_TIME = datetime(2262, 4, 11, tzinfo=timezone.utc)
+
+
+def _parse_time(value: str) -> datetime:
+    try:
+        t = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPError(400, f"invalid datetime: {value}")
+    t = t if t.tzinfo is not None else t.replace(tzinfo=JST)
+    return min(max(t, MIN_TIME), MAX_TIME)
+
+
+def _filter(book: ResultBook, params: Dict[str, str]) -> ResultBook:
+    if "start" not in params and "end" not in params:
+        return book
+    start = _parse_time(params["start"]) if "start" in params else MIN_TIME
+    end = _parse_time(params["end"]) if "end" in params else MAX_TIME
+    return book.filter_by_period((start, end))
+
+
+def _int_param(params: Dict[str, str], name: str, default: Optional[int] = None) -> Optional[int]:
+    if name not in params:
+        return default
+    try:
+        return int(params[name])
+    except ValueError:
+        raise HTTPError(400, f"{name} must be an integer")
+
+
+def _aggregate(book: ResultBook, params: Dict[str, str]) -> Response:
+    player_num = _int_param(params, "player_num", 4)
+    if player_num not in (3, 4):
+        raise HTTPError(400, "player_num must be 3 or 4")
+    df = _filter(book, params).aggregate(player_num, extra=params.get("extra") in ("1", "true"))
+    return 200, "application/json; charset=utf-8", df.to_json(orient="records", force_ascii=False).encode()
+
+
+def _plot(book: ResultBook, params: Dict[str, str]) -> Response:
+    highlight = [name for name in params.get("highlight", "").split(",") if name]
+    fig = _filter(book, params).plot_cumsum(fast=True, top_n=_int_param(params, "top_n"), highlight=highlight)
+    buffer = BytesIO()
+    fig.savefig(buffer, format="png")
+    return 200, "image/png", buffer.getvalue()
+
+
+class StubAPI:
+    """nodocchi.moeのAPIのスタブ
+
+    directory/lobby/{ロビーID}.json, directory/player/{プレイヤー名}.jsonをレスポンスとして返す.
+    ファイルが無ければ空の結果を返す
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+    async def handle(self, method: str, target: str, body: bytes) -> Response:
+        if method != "POST":
+            raise HTTPError(405, f"{method} is not allowed")
+        form = {key: values[-1] for (key, values) in parse_qs(body.decode()).items()}
+        path = urlsplit(target).path
+        if path.endswith("/lobby.php") and "lobby" in form:
+            file = self.directory / "lobby" / f"{form['lobby']}.json"
+        elif path.endswith("/listuser.php") and "name" in form:
+            file = self.directory / "player" / f"{form['name']}.json"
+        else:
+            raise HTTPError(404, f"not found: {path}")
+        if not file.exists():
+            return json_response({"earliest": None, "lobby": None, "list": []})
+        return 200, "application/json; charset=utf-8", file.read_bytes()
+
+
+async def run_forever(server: asyncio.AbstractServer) -> None:
+    async with server:
+        await server.serve_forever()
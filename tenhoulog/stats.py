@@ -0,0 +1,364 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+HEAD_TO_HEAD_COLUMNS = ["名前", "相手", "同卓数", "勝ち", "負け", "勝率", "得点差", "平均得点差"]
+HISTORY_COLUMNS = [
+    "試合数",
+    "累積得点",
+    "累積祝儀",
+    "直近平均順位",
+    "直近得点",
+    "連続トップ",
+    "連続ラス",
+    "レート",
+    "段位",
+    "段位ポイント",
+]
+STREAK_COLUMNS = ["名前", "最長連続トップ", "最長連続ラス", "最終レート", "最高レート"]
+# 縦持ちの列と, その累積和を持つ``player_history``の列の対応
+CUMULATIVE_COLUMNS = {"point": "累積得点", "tip": "累積祝儀"}
+BOOTSTRAP_STATS = ["平均順位", "平均得点", "トップ率"]
+# ブートストラップで1度に生成する乱数の数の目安
+_BOOTSTRAP_CHUNK = 1 << 22
+# 天鳳のレーティングの順位点
+RATING_POINTS = {4: np.array([30.0, 10.0, -10.0, -30.0]), 3: np.array([30.0, 0.0, -30.0])}
+# 天鳳の段位と, 昇段(級)したときの初期ポイント・昇段(級)に必要なポイント・ラスのときのポイント(南風戦)
+DAN_NAMES = ["新人", "9級", "8級", "7級", "6級", "5級", "4級", "3級", "2級", "1級"] + [
+    f"{name}段" for name in ["初", "二", "三", "四", "五", "六", "七", "八", "九", "十"]
+]
+DAN_START = np.array([0.0] * 10 + [200.0 * i for i in range(1, 11)])
+DAN_PROMOTE = np.array(
+    [20.0, 20.0, 20.0, 20.0, 40.0, 60.0, 80.0, 100.0, 100.0, 100.0] + [400.0 * i for i in range(1, 11)]
+)
+DAN_LAST_POINTS = np.array([0.0] * 8 + [-10.0, -20.0] + [-30.0 - 15.0 * i for i in range(10)])
+# ラス以外の順位のポイント. 鳳凰卓南風戦の値で, 三人打ちは2位を0とする
+DAN_POINTS = {4: (90.0, 45.0, 0.0), 3: (90.0, 0.0)}
+_FIRST_DAN = DAN_NAMES.index("初段")
+
+
+def head_to_head(long: pd.DataFrame, top_k: Optional[int] = None) -> pd.DataFrame:
+    """同卓したプレイヤー同士の対戦成績を集計
+
+    同じ試合の行同士を1回の結合で組にして集計するため, 計算量は同卓した組の数に比例する.
+    結果は同卓したことのある組だけを持つ(疎な)表で, 行列が必要なら``unstack``する
+
+    Args:
+        - long (pd.DataFrame): ``long_frame``の形式の結果
+        - top_k (int, optional): 各プレイヤーについて同卓数の多い相手top_k人だけを残す
+
+    Returns:
+        1行が(名前, 相手)の組. 勝ちは名前の方が上の順位だった試合数, 得点差は名前の得点 - 相手の得点
+    """
+    codes, names = pd.factorize(long["player"])
+    n = len(names)
+    df = pd.DataFrame(
+        {
+            "game_id": long["game_id"].to_numpy(),
+            "code": codes,
+            "rank": long["rank"].to_numpy(),
+            "point": long["point"].to_numpy(dtype=float),
+        }
+    )
+    pairs = df.merge(df, on="game_id", suffixes=("", "_o"))
+    pairs = pairs[pairs["code"] != pairs["code_o"]]
+    keys, inverse = np.unique(pairs["code"].to_numpy() * n + pairs["code_o"].to_numpy(), return_inverse=True)
+    inverse = inverse.ravel()
+    games = np.bincount(inverse, minlength=len(keys))
+    wins = np.bincount(inverse, weights=pairs["rank"].to_numpy() < pairs["rank_o"].to_numpy(), minlength=len(keys))
+    losses = np.bincount(
+        inverse, weights=pairs["rank"].to_numpy() > pairs["rank_o"].to_numpy(), minlength=len(keys)
+    )
+    delta = np.bincount(
+        inverse, weights=pairs["point"].to_numpy() - pairs["point_o"].to_numpy(), minlength=len(keys)
+    )
+    names = np.asarray(names, dtype=object)
+    result = pd.DataFrame(
+        {
+            "名前": names[keys // n] if n else [],
+            "相手": names[keys % n] if n else [],
+            "同卓数": games,
+            "勝ち": wins.astype(int),
+            "負け": losses.astype(int),
+            "勝率": wins / games,
+            "得点差": delta,
+            "平均得点差": delta / games,
+        },
+        columns=HEAD_TO_HEAD_COLUMNS,
+    )
+    result = result.sort_values(["名前", "同卓数"], ascending=[True, False], kind="stable")
+    if top_k is not None:
+        result = result.groupby("名前", sort=False).head(top_k)
+    return result.reset_index(drop=True)
+
+
+def cumulative(long: pd.DataFrame, value: str, players: Optional[List[str]] = None) -> pd.DataFrame:
+    """プレイヤーごとのvalueの累積和
+
+    欠損の行は除き, 各プレイヤーのn試合目をn-1行目に揃えた表を返す. 列はplayers(省略時は登場順)
+    """
+    records = long[long[value].notnull()]
+    grouped = records.groupby("player", sort=False)
+    cumsum = pd.DataFrame(
+        {"x": grouped.cumcount(), "player": records["player"], "y": grouped[value].cumsum().astype(float)}
+    )
+    table = cumsum.pivot(index="x", columns="player", values="y").rename_axis(index=None, columns=None)
+    if players is None:
+        players = list(pd.unique(records["player"]))
+    return table.reindex(columns=players)
+
+
+def player_history(
+    long: pd.DataFrame,
+    player_num: int,
+    window: int = 10,
+    initial_rate: float = 1500.0,
+    table_rate: float = 1500.0,
+    dan_points: Optional[Sequence[float]] = None,
+) -> pd.DataFrame:
+    """プレイヤーごとの試合ごとの推移
+
+    全プレイヤーの行をプレイヤー, game_idの順に並べ, 区切りごとの累積和の差として
+    直近window試合の平均順位・得点や連続トップ・ラスを一度に計算する.
+    レートは天鳳のレーティング(順位点 + (卓平均R - R) / 40を試合数で補正)で, 他家のRは分からないため
+    卓平均Rをtable_rateとみなす. 段位は新人から始めて天鳳の段位戦の昇段・降段の規定で進める
+
+    Args:
+        - long (pd.DataFrame): ``long_frame``の形式の結果. playernumの列があればplayer_num人打ちの試合だけを使う.
+          無ければ全てplayer_num人打ちの試合とみなし, player_numより下の順位があればValueError
+        - player_num (int): 3 or 4
+        - window (int): 直近何試合を集計するか
+        - dan_points (Sequence[float], optional): ラス以外の順位の段位ポイント. 省略時は``DAN_POINTS``
+
+    Returns:
+        longの列に``HISTORY_COLUMNS``を加えたもの. 行はプレイヤー(登場順), game_idの順
+    """
+    if "playernum" in long.columns:
+        long = long[long["playernum"] == player_num]
+    elif (long["rank"] > player_num).any():
+        raise ValueError(f"long contains games with more than {player_num} players. add the playernum column")
+    long = long[long["point"].notnull()]
+    codes, names = pd.factorize(long["player"])
+    order = np.lexsort((long["game_id"].to_numpy(), codes))
+    history = long.iloc[order].reset_index(drop=True)
+    codes = codes[order]
+    n = len(history)
+    idx = np.arange(n)
+    is_start = np.ones(n, dtype=bool)
+    is_start[1:] = codes[1:] != codes[:-1]
+    group_start = np.maximum.accumulate(np.where(is_start, idx, 0)) if n else idx
+    position = idx - group_start
+
+    rank = history["rank"].to_numpy().astype(np.int64)
+    point = history["point"].to_numpy(dtype=float)
+    tip = np.nan_to_num(history["tip"].astype(float).to_numpy())
+
+    def group_cumsum(values: np.ndarray) -> np.ndarray:
+        total = np.concatenate([[0.0], np.cumsum(values)])
+        return total[idx + 1] - total[group_start]
+
+    def rolling_sum(values: np.ndarray) -> np.ndarray:
+        total = np.concatenate([[0.0], np.cumsum(values)])
+        return total[idx + 1] - total[np.maximum(group_start, idx - window + 1)]
+
+    def streak(flag: np.ndarray) -> np.ndarray:
+        last_break = np.maximum(np.maximum.accumulate(np.where(flag, -1, idx)) if n else idx, group_start - 1)
+        return np.where(flag, idx - last_break, 0)
+
+    points = np.append(dan_points if dan_points is not None else DAN_POINTS[player_num], 0.0)
+    history["試合数"] = position + 1
+    history["累積得点"] = group_cumsum(point)
+    history["累積祝儀"] = group_cumsum(tip)
+    history["直近平均順位"] = rolling_sum(rank.astype(float)) / np.minimum(position + 1, window)
+    history["直近得点"] = rolling_sum(point)
+    history["連続トップ"] = streak(rank == 1)
+    history["連続ラス"] = streak(rank == player_num)
+    history["レート"] = _rating(codes, position, RATING_POINTS[player_num][rank - 1], initial_rate, table_rate)
+    level, dan_point = _dan(codes, position, rank, player_num, points)
+    history["段位"] = np.array(DAN_NAMES, dtype=object)[level]
+    history["段位ポイント"] = dan_point
+    return history
+
+
+def _by_position(position: np.ndarray) -> List[np.ndarray]:
+    """各プレイヤーのk試合目の行の位置のリスト"""
+    if len(position) == 0:
+        return []
+    order = np.argsort(position, kind="stable")
+    bounds = np.searchsorted(position[order], np.arange(position.max() + 2))
+    return [order[bounds[k] : bounds[k + 1]] for k in range(position.max() + 1)]
+
+
+def _rating(
+    codes: np.ndarray, position: np.ndarray, base: np.ndarray, initial_rate: float, table_rate: float
+) -> np.ndarray:
+    """各試合後のレート. k試合目の行を全プレイヤー分まとめて更新する"""
+    rate = np.empty(len(codes))
+    if len(codes) == 0:
+        return rate
+    current = np.full(codes.max() + 1, initial_rate)
+    for k, rows in enumerate(_by_position(position)):
+        players = codes[rows]
+        adjust = 1 - k * 0.002 if k < 400 else 0.2
+        current[players] += adjust * (base[rows] + (table_rate - current[players]) / 40)
+        rate[rows] = current[players]
+    return rate
+
+
+def _dan(
+    codes: np.ndarray, position: np.ndarray, rank: np.ndarray, player_num: int, points: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """各試合後の段位(``DAN_NAMES``の位置)と段位ポイント. k試合目の行を全プレイヤー分まとめて更新する
+
+    ポイントが昇段に必要な値に達すると次の段位の初期ポイントになり, 二段以上で0未満になると1つ下の段位の
+    初期ポイントになる. 初段以下は降段せず, ポイントは0未満にならない
+    """
+    level = np.zeros(len(codes), dtype=np.int64)
+    dan_point = np.zeros(len(codes))
+    if len(codes) == 0:
+        return level, dan_point
+    current_level = np.zeros(codes.max() + 1, dtype=np.int64)
+    current_point = np.zeros(codes.max() + 1)
+    top = len(DAN_NAMES) - 1
+    for rows in _by_position(position):
+        players = codes[rows]
+        lv = current_level[players]
+        is_last = rank[rows] == player_num
+        pt = current_point[players] + np.where(is_last, DAN_LAST_POINTS[lv], points[rank[rows] - 1])
+        promote = (pt >= DAN_PROMOTE[lv]) & (lv < top)
+        demote = (pt < 0) & (lv > _FIRST_DAN)
+        lv = lv + promote - demote
+        pt = np.maximum(np.where(promote | demote, DAN_START[lv], pt), 0.0)
+        current_level[players] = lv
+        current_point[players] = pt
+        level[rows] = lv
+        dan_point[rows] = pt
+    return level, dan_point
+
+
+def pivot_history(history: pd.DataFrame, column: str, players: Optional[List[str]] = None) -> pd.DataFrame:
+    """``player_history``の結果のcolumnを, 各プレイヤーのn試合目をn-1行目に揃えた表にする
+
+    ``cumulative``と同じ形なので, 計算済みの推移をそのまま``plotting.plot_lines``などで描画できる
+    """
+    table = history.pivot(index="試合数", columns="player", values=column)
+    table = table.set_axis(table.index - 1, axis=0).rename_axis(index=None, columns=None)
+    if players is None:
+        players = list(pd.unique(history["player"]))
+    return table.reindex(columns=players)
+
+
+def streaks(history: pd.DataFrame) -> pd.DataFrame:
+    """``player_history``の結果からプレイヤーごとの最長連続トップ・ラスとレートをまとめる"""
+    grouped = history.groupby("player", sort=False)
+    df = grouped.agg(
+        最長連続トップ=("連続トップ", "max"),
+        最長連続ラス=("連続ラス", "max"),
+        最終レート=("レート", "last"),
+        最高レート=("レート", "max"),
+    )
+    return df.rename_axis("名前").reset_index()[STREAK_COLUMNS]
+
+
+def _stat_values(long: pd.DataFrame, stats: Sequence[str]) -> np.ndarray:
+    """(統計量の数, 行数)の, 平均をとると各統計量になる値"""
+    rank = long["rank"].to_numpy(dtype=float)
+    columns = {"平均順位": rank, "平均得点": long["point"].to_numpy(dtype=float), "トップ率": (rank == 1) * 1.0}
+    unknown = [stat for stat in stats if stat not in columns]
+    if unknown:
+        raise ValueError(f"unknown stats: {unknown}. choose from {BOOTSTRAP_STATS}")
+    return np.array([columns[stat] for stat in stats]).reshape(len(stats), len(long))
+
+
+def _resample_means(
+    values: np.ndarray, starts: np.ndarray, lengths: np.ndarray, n_resamples: int, seed: np.random.SeedSequence
+) -> np.ndarray:
+    """プレイヤーごとに復元抽出したn_resamples組の平均. 形は(n_resamples, 統計量の数, プレイヤー数)"""
+    rng = np.random.default_rng(seed)
+    row_starts = np.repeat(starts, lengths)
+    row_lengths = np.repeat(lengths, lengths)
+    index = row_starts + (rng.random((n_resamples, len(row_starts))) * row_lengths).astype(np.int64)
+    means = np.empty((n_resamples, len(values), len(starts)))
+    for i, stat_values in enumerate(values):
+        means[:, i] = np.add.reduceat(stat_values[index], starts, axis=1) / lengths
+    return means
+
+
+def bootstrap_samples(
+    long: pd.DataFrame,
+    n_resamples: int = 1000,
+    stats: Sequence[str] = BOOTSTRAP_STATS,
+    seed: Optional[int] = None,
+    processes: Optional[int] = 1,
+) -> Tuple[List[str], np.ndarray]:
+    """プレイヤーごとに試合を復元抽出して統計量を求める
+
+    全プレイヤー・複数の抽出をまとめて配列の演算で計算する. 抽出は乱数が一定の数になるように分割し,
+    分割ごとにseedから派生させた乱数を使うため, 結果はprocessesによらない
+
+    Args:
+        - long (pd.DataFrame): ``long_frame``の形式の結果
+        - n_resamples (int): 抽出の回数
+        - stats (Sequence[str]): ``BOOTSTRAP_STATS``から選ぶ統計量
+        - seed (int, optional): 乱数のシード
+        - processes (int, optional): プロセス数. 1ならプールを使わない. Noneの場合はCPU数
+
+    Returns:
+        (プレイヤー名, (n_resamples, 統計量の数, プレイヤー数)の配列)
+    """
+    long = long[long["point"].notnull()]
+    codes, names = pd.factorize(long["player"])
+    order = np.argsort(codes, kind="stable")
+    values = _stat_values(long.iloc[order], stats)
+    lengths = np.bincount(codes, minlength=len(names))
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+    if len(long) == 0:
+        return list(names), np.zeros((n_resamples, len(stats), 0))
+
+    chunk = max(1, _BOOTSTRAP_CHUNK // len(long))
+    sizes = [min(chunk, n_resamples - start) for start in range(0, n_resamples, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = (repeat(values), repeat(starts), repeat(lengths), sizes, seeds)
+    if processes == 1 or len(sizes) == 1:
+        chunks = list(map(_resample_means, *args))
+    else:
+        with ProcessPoolExecutor(processes) as executor:
+            chunks = list(executor.map(_resample_means, *args))
+    return list(names), np.concatenate(chunks) if chunks else np.zeros((0, len(stats), len(names)))
+
+
+def bootstrap(
+    long: pd.DataFrame,
+    n_resamples: int = 1000,
+    stats: Sequence[str] = BOOTSTRAP_STATS,
+    confidence: float = 0.95,
+    seed: Optional[int] = None,
+    processes: Optional[int] = 1,
+    players: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """統計量とブートストラップ法による信頼区間
+
+    引数は``bootstrap_samples``と同様. confidenceは信頼区間の信頼係数.
+    playersを指定するとその順に並べ, 試合の無いプレイヤーの統計量は欠損にする
+
+    Returns:
+        名前, 回数と, 統計量ごとに(統計量, 統計量_下限, 統計量_上限)の列を持つDataFrame
+    """
+    long = long[long["point"].notnull()]
+    names, samples = bootstrap_samples(long, n_resamples, stats, seed, processes)
+    codes = pd.Index(names).get_indexer(long["player"])
+    times = np.bincount(codes, minlength=len(names))
+    values = _stat_values(long, stats)
+    alpha = (1 - confidence) / 2
+    df = pd.DataFrame({"名前": names, "回数": times})
+    for i, stat in enumerate(stats):
+        df[stat] = np.bincount(codes, weights=values[i], minlength=len(names)) / np.maximum(times, 1)
+        df[f"{stat}_下限"] = np.quantile(samples[:, i], alpha, axis=0) if len(samples) else np.nan
+        df[f"{stat}_上限"] = np.quantile(samples[:, i], 1 - alpha, axis=0) if len(samples) else np.nan
+    if players is not None:
+        df = df.set_index("名前").reindex(players).rename_axis("名前").reset_index()
+        df["回数"] = df["回数"].fillna(0).astype(int)
+    return df
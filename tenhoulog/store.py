@@ -0,0 +1,81 @@
+import json
+import shutil
+from datetime import datetime, timedelta, timezone, tzinfo
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from .book import align_timestamp, games_frame_from_results, long_frame
+
+# プレイヤー名の順序とタイムゾーンを保存するファイル
+META_FILE = "_tenhoulog.json"
+PART_FILE = "part-0.parquet"
+
+
+def _partition_dir(path: Path, month: str) -> Path:
+    return path / f"month={month}"
+
+
+def _dump_tz(tz: Optional[tzinfo]) -> Dict[str, Any]:
+    """タイムゾーンを保存する形式にする
+
+    ``timezone(timedelta(hours=9), "JST")``のような固定のオフセットは名前では復元できないので, オフセットの秒数で保存する
+    """
+    if tz is None:
+        return {"tz": None, "tz_offset": None}
+    offset = tz.utcoffset(None)
+    if offset is not None:
+        return {"tz": None, "tz_offset": offset.total_seconds()}
+    return {"tz": str(tz), "tz_offset": None}
+
+
+def _load_tz(meta: Dict[str, Any]) -> Any:
+    if meta.get("tz_offset") is not None:
+        return timezone(timedelta(seconds=meta["tz_offset"]))
+    return meta["tz"]
+
+
+def write_long(long: pd.DataFrame, path: Union[str, Path], player_names: List[str]) -> None:
+    """縦持ちのDataFrameをstarttimeの月ごとのParquetに分割して保存する
+
+    保存先に既にあるパーティションは削除してから書き込む
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    for old in path.glob("month=*"):
+        shutil.rmtree(old)
+    starttime = pd.to_datetime(long["starttime"])
+    long = long.assign(starttime=starttime)
+    for month, part in long.groupby(starttime.dt.strftime("%Y-%m"), sort=True):
+        directory = _partition_dir(path, str(month))
+        directory.mkdir()
+        part.reset_index(drop=True).to_parquet(directory / PART_FILE, index=False)
+    meta = {"players": player_names, **_dump_tz(starttime.dt.tz)}
+    (path / META_FILE).write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+
+def read_long(
+    path: Union[str, Path], time_period: Optional[Tuple[datetime, datetime]] = None
+) -> Tuple[pd.DataFrame, List[str]]:
+    """``write_long``で保存したデータを読み込む
+
+    time_periodを指定すると, 期間を含む月のパーティションだけを読み込み, さらに期間内の行にフィルタする
+
+    Returns:
+        (縦持ちのDataFrame, 保存時のプレイヤー名のリスト)
+    """
+    path = Path(path)
+    meta = json.loads((path / META_FILE).read_text(encoding="utf-8"))
+    directories = sorted(path.glob("month=*"))
+    if time_period is not None:
+        start, end = (align_timestamp(t, _load_tz(meta)) for t in time_period)
+        first, last = f"month={start:%Y-%m}", f"month={end:%Y-%m}"
+        directories = [d for d in directories if first <= d.name <= last]
+    parts = [pd.read_parquet(d / PART_FILE) for d in directories]
+    if not parts:
+        return long_frame(games_frame_from_results([])), meta["players"]
+    long = pd.concat(parts, ignore_index=True)
+    if time_period is not None:
+        long = long[(time_period[0] <= long["starttime"]) & (long["starttime"] < time_period[1])]
+    return long.reset_index(drop=True), meta["players"]
@@ -0,0 +1,183 @@
+from datetime import datetime
+
+import pytest
+
+from tenhoulog.models import GameResult
+
+
+@pytest.fixture
+def player_names():
+    return [
+        "アカギ",
+        "ワシズ",
+        "黒服A",
+        "黒服B",
+        "黒服C",
+        "黒服D",
+    ]
+
+
+@pytest.fixture
+def game_results_3():
+    """
+    +--------+--------+-------+--------+--------+--------+
+    | アカギ  | ワシズ  | 黒服A  | 黒服B  |  黒服C  | 黒服D   |
+    +--------+--------+-------+--------+--------+--------+
+    | 100.0  | -88.2  | -11.8 |  nan   |  nan   |  nan   |
+    +--------+--------+-------+--------+--------+--------+
+    | 290.4  |  nan   |  nan  | -160.4 |  nan   | -130.0 |
+    +--------+--------+-------+--------+--------+--------+
+    |  nan   | 380.0  |  nan  | -220.0 | -160.0 |  nan   |
+    +--------+--------+-------+--------+--------+--------+
+    |  nan   |  nan   | 45.6  |  0.0   | -45.6  |  nan   |
+    +--------+--------+-------+--------+--------+--------+
+
+    """
+    fields = [
+        {
+            "lobby": "1111",
+            "playernum": 3,
+            "player1": "アカギ",
+            "player1ptr": 100.0,
+            "player1shuugi": 10,
+            "player2": "黒服A",
+            "player2ptr": -11.8,
+            "player2shuugi": -2,
+            "player3": "ワシズ",
+            "player3ptr": -88.2,
+            "player3shuugi": -8,
+            "starttime": datetime(1978, 11, 22),
+        },
+        {
+            "lobby": "1111",
+            "playernum": 3,
+            "player1": "アカギ",
+            "player1ptr": 290.4,
+            "player1shuugi": None,
+            "player2": "黒服D",
+            "player2ptr": -130.0,
+            "player2shuugi": None,
+            "player3": "黒服B",
+            "player3ptr": -160.4,
+            "player3shuugi": None,
+            "starttime": datetime(1978, 11, 23),
+        },
+        {
+            "lobby": "1111",
+            "playernum": 3,
+            "player1": "ワシズ",
+            "player1ptr": 380,
+            "player1shuugi": 140,
+            "player2": "黒服C",
+            "player2ptr": -160,
+            "player2shuugi": -70,
+            "player3": "黒服B",
+            "player3ptr": -220,
+            "player3shuugi": -70,
+            "starttime": datetime(1978, 11, 23),
+        },
+        {
+            "lobby": "1111",
+            "playernum": 3,
+            "player1": "黒服A",
+            "player1ptr": 45.6,
+            "player1shuugi": None,
+            "player2": "黒服B",
+            "player2ptr": 0,
+            "player2shuugi": None,
+            "player3": "黒服C",
+            "player3ptr": -45.6,
+            "player3shuugi": None,
+            "starttime": datetime(1978, 11, 24),
+        },
+    ]
+    return [GameResult(**field) for field in fields]
+
+
+@pytest.fixture
+def game_results_4():
+    """
+    +--------+--------+-------+--------+--------+--------+
+    | アカギ  | ワシズ  | 黒服A  | 黒服B  |  黒服C  | 黒服D   |
+    +--------+--------+-------+--------+--------+--------+
+    | 100.0  | -88.2  | -8.3  |  3.5   |  nan   |  nan   |
+    +--------+--------+-------+--------+--------+--------+
+    | 290.4  |  nan   |  0.0  | -160.4 |  nan   | -130.0 |
+    +--------+--------+-------+--------+--------+--------+
+    |  nan   | 380.0  |  -50  | -220.0 | -110.0 |  nan   |
+    +--------+--------+-------+--------+--------+--------+
+    |  nan   |  nan   | 55.6  |  0.0   | -45.6  |  -10   |
+    +--------+--------+-------+--------+--------+--------+
+
+    """
+    fields = [
+        {
+            "lobby": "1111",
+            "playernum": 4,
+            "player1": "アカギ",
+            "player1ptr": 100.0,
+            "player1shuugi": 10,
+            "player2": "黒服B",
+            "player2ptr": 3.5,
+            "player2shuugi": 0,
+            "player3": "黒服A",
+            "player3ptr": -8.3,
+            "player3shuugi": -2,
+            "player4": "ワシズ",
+            "player4ptr": -88.2,
+            "player4shuugi": -8,
+            "starttime": datetime(1978, 11, 22),
+        },
+        {
+            "lobby": "1111",
+            "playernum": 4,
+            "player1": "アカギ",
+            "player1ptr": 290.4,
+            "player1shuugi": None,
+            "player2": "黒服A",
+            "player2ptr": 0,
+            "player2shuugi": None,
+            "player3": "黒服D",
+            "player3ptr": -130.0,
+            "player3shuugi": None,
+            "player4": "黒服B",
+            "player4ptr": -160.4,
+            "player4shuugi": None,
+            "starttime": datetime(1978, 11, 23),
+        },
+        {
+            "lobby": "1111",
+            "playernum": 4,
+            "player1": "ワシズ",
+            "player1ptr": 380,
+            "player1shuugi": 140,
+            "player2": "黒服A",
+            "player2ptr": -50,
+            "player2shuugi": -20,
+            "player3": "黒服C",
+            "player3ptr": -110,
+            "player3shuugi": -50,
+            "player4": "黒服B",
+            "player4ptr": -220,
+            "player4shuugi": -70,
+            "starttime": datetime(1978, 11, 23),
+        },
+        {
+            "lobby": "1111",
+            "playernum": 4,
+            "player1": "黒服A",
+            "player1ptr": 55.6,
+            "player1shuugi": None,
+            "player2": "黒服B",
+            "player2ptr": 0,
+            "player2shuugi": None,
+            "player3": "黒服D",
+            "player3ptr": -10.0,
+            "player3shuugi": None,
+            "player4": "黒服C",
+            "player4ptr": -45.6,
+            "player4shuugi": None,
+            "starttime": datetime(1978, 11, 24),
+        },
+    ]
+    return [GameResult(**field) for field in fields]
@@ -0,0 +1,35 @@
+from datetime import timezone
+
+import pandas as pd
+
+from tenhoulog.arrays import GameResultArray
+from tenhoulog.models import GameTuple, ResultBook
+
+
+def test_game_tuple(game_results_4):
+    for result in game_results_4:
+        game = GameTuple.from_model(result)
+        assert game.player_names() == result.player_names()
+        assert game.to_records() == result.to_records()
+        assert game.to_model() == result
+
+
+def test_game_result_array_roundtrip(game_results_3, game_results_4):
+    results = game_results_3 + [
+        r.copy(update={"starttime": r.starttime.replace(tzinfo=timezone.utc)}) for r in game_results_4
+    ]
+    array = GameResultArray.from_results(results[:4], chunk_size=3)
+    assert len(array) == 4
+    assert array.to_results() == results[:4]
+    assert array[1] == GameTuple.from_model(results[1])
+    aware = GameResultArray.from_results(results[4:])
+    assert aware.to_results() == results[4:]
+    assert aware.columns["player1shuugi"].dtype == "int16"
+
+
+def test_book_from_game_result_array(game_results_4, player_names):
+    expected = ResultBook.from_results(game_results_4, player_names)
+    for results in [GameResultArray.from_results(game_results_4), [GameTuple.from_model(r) for r in game_results_4]]:
+        book = ResultBook.from_results(results, player_names)
+        for attr in ["scores", "ranks", "tips"]:
+            pd.testing.assert_frame_equal(getattr(expected, attr), getattr(book, attr), check_dtype=False)
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from tenhoulog import io
+from tenhoulog.cache import ResultCache
+from tenhoulog.models import APIResponse, GameResult
+
+
+def make_result(player1: str, starttime: datetime) -> GameResult:
+    return GameResult(
+        lobby=None,
+        playernum=3,
+        player1=player1,
+        player1ptr=45.6,
+        player1shuugi=None,
+        player2="黒服B",
+        player2ptr=0.0,
+        player2shuugi=None,
+        player3="黒服C",
+        player3ptr=-45.6,
+        player3shuugi=None,
+        starttime=starttime,
+    )
+
+
+@pytest.fixture
+def fake_post(monkeypatch):
+    """io.httpx.postを差し替え, 呼び出された際のdataを記録する"""
+    state = {"results": [], "calls": []}
+
+    def post(url, data):
+        state["calls"].append(data)
+        text = APIResponse(earliest=None, lobby=None, list=state["results"]).json()
+        return httpx.Response(200, text=text)
+
+    monkeypatch.setattr(io.httpx, "post", post)
+    return state
+
+
+def test_cache_merge_deduplicates():
+    t0 = datetime(1978, 11, 22, tzinfo=timezone.utc)
+    with ResultCache(":memory:") as cache:
+        cache.merge("name", "アカギ", [make_result("アカギ", t0)])
+        merged = cache.merge(
+            "name", "アカギ", [make_result("アカギ", t0), make_result("アカギ", t0 + timedelta(hours=1))]
+        )
+        assert [r.starttime for r in merged] == [t0, t0 + timedelta(hours=1)]
+        assert cache.get("name", "ワシズ") is None
+
+
+def test_cache_get_skips_validation(monkeypatch):
+    t0 = datetime(1978, 11, 22, tzinfo=timezone(timedelta(hours=9)))
+    stored = [make_result("アカギ", t0), make_result("ワシズ", t0 + timedelta(hours=1))]
+    with ResultCache(":memory:") as cache:
+        cache.merge("name", "アカギ", stored)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("cached results must not be validated again")
+
+        monkeypatch.setattr(GameResult, "__init__", fail)
+        monkeypatch.setattr(GameResult, "parse_raw", fail)
+        entry = cache.get("name", "アカギ")
+        assert entry.results == stored
+        assert entry.results[0].starttime.utcoffset() == timedelta(hours=9)
+
+
+def test_fetch_player_log_uses_cache(fake_post):
+    t0 = datetime(1978, 11, 22, tzinfo=timezone.utc)
+    fake_post["results"] = [make_result("アカギ", t0)]
+    with ResultCache(":memory:", ttl=timedelta(hours=1)) as cache:
+        assert len(io.fetch_player_log("アカギ", cache=cache)) == 1
+        assert len(io.fetch_player_log("アカギ", cache=cache)) == 1
+        assert len(fake_post["calls"]) == 1
+
+
+def test_fetch_player_log_incremental(fake_post):
+    t0 = datetime(1978, 11, 22, tzinfo=timezone.utc)
+    t1 = t0 + timedelta(hours=1)
+    fake_post["results"] = [make_result("アカギ", t0)]
+    with ResultCache(":memory:", ttl=timedelta(0)) as cache:
+        io.fetch_player_log("アカギ", cache=cache)
+        fake_post["results"] = [make_result("アカギ", t0), make_result("アカギ", t1)]
+        results = io.fetch_player_log("アカギ", cache=cache)
+    assert [r.starttime for r in results] == [t0, t1]
+    assert fake_post["calls"] == [{"name": "アカギ"}, {"name": "アカギ", "start": str(int(t0.timestamp()))}]
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from tenhoulog.compact import CompactResultBook
+from tenhoulog.models import GameResult, ResultBook
+
+
+def test_compact_aggregate(game_results_4, player_names):
+    book = ResultBook.from_results(game_results_4, player_names)
+    compact = CompactResultBook.from_results(game_results_4, player_names)
+    pd.testing.assert_frame_equal(book.aggregate(4, extra=True), compact.aggregate(4, extra=True), check_dtype=False)
+
+
+def test_compact_dtypes(game_results_4, player_names):
+    records = CompactResultBook.from_results(game_results_4, player_names).records
+    assert records["player"].dtype == "category"
+    assert records["rank"].dtype == "int8"
+    assert records["tip"].dtype == "Int16"
+
+
+def test_compact_to_book(game_results_3, player_names):
+    book = ResultBook.from_results(game_results_3, player_names)
+    converted = CompactResultBook.from_results(game_results_3, player_names).to_book()
+    for attr in ["scores", "ranks", "tips"]:
+        pd.testing.assert_frame_equal(getattr(book, attr), getattr(converted, attr), check_dtype=False)
+
+
+def test_compact_from_book(game_results_4, player_names):
+    book = ResultBook.from_results(game_results_4, player_names)
+    compact = CompactResultBook.from_book(book)
+    pd.testing.assert_frame_equal(book.aggregate(4), compact.aggregate(4), check_dtype=False)
+
+
+def test_compact_filter_and_add(game_results_3, game_results_4, player_names):
+    books = [ResultBook.from_results(r, player_names) for r in (game_results_3, game_results_4)]
+    compacts = [CompactResultBook.from_results(r, player_names) for r in (game_results_3, game_results_4)]
+    period = (datetime(1978, 11, 23), datetime(1978, 11, 25))
+    expected = (books[0] + books[1]).filter_by_period(period).aggregate(4)
+    actual = (compacts[0] + compacts[1]).filter_by_period(period).aggregate(4)
+    expected = expected.set_index("名前").sort_index()
+    actual = actual.set_index("名前").sort_index()
+    pd.testing.assert_frame_equal(expected, actual, check_dtype=False)
+
+
+def test_compact_aggregate_many_players():
+    # cat.codesがint8になるプレイヤー数でも桁あふれしない
+    rng = np.random.default_rng(0)
+    names = [f"player{i}" for i in range(40)]
+    results = []
+    for i in range(500):
+        seats = rng.choice(len(names), 4, replace=False)
+        results.append(
+            GameResult(
+                lobby=None,
+                playernum=4,
+                player1=names[seats[0]],
+                player1ptr=50.0,
+                player1shuugi=1,
+                player2=names[seats[1]],
+                player2ptr=10.0,
+                player2shuugi=0,
+                player3=names[seats[2]],
+                player3ptr=-20.0,
+                player3shuugi=0,
+                player4=names[seats[3]],
+                player4ptr=-40.0,
+                player4shuugi=-1,
+                starttime=datetime(2020, 1, 1) + timedelta(minutes=i),
+            )
+        )
+    compact = CompactResultBook.from_results(results)
+    assert compact.records["player"].cat.codes.dtype == "int8"
+    expected = compact.to_book().aggregate(4, extra=True).set_index("名前").sort_index()
+    actual = compact.aggregate(4, extra=True).set_index("名前").sort_index()
+    pd.testing.assert_frame_equal(expected, actual, check_dtype=False)
+
+
+def test_compact_sorted_by_starttime(game_results_3, game_results_4, player_names):
+    # 入力の順やBookを結合する順によらず, 推移はstarttime順になる
+    results = [
+        r.copy(update={"starttime": r.starttime + timedelta(minutes=i)})
+        for (i, r) in enumerate(game_results_3 + game_results_4)
+    ]
+    book = ResultBook.from_results(results, player_names)
+    reversed_book = CompactResultBook.from_results(results[::-1], player_names)
+    added = CompactResultBook.from_results(results[3:], player_names) + CompactResultBook.from_results(
+        results[:3], player_names
+    )
+
+    def history(b, player_num):
+        df = b.history(player_num).astype({"player": object}).drop(columns="game_id")
+        return df.sort_values(["player", "試合数"]).reset_index(drop=True)
+
+    for compact in (reversed_book, added):
+        assert compact.records["starttime"].is_monotonic_increasing
+        for player_num in (3, 4):
+            pd.testing.assert_frame_equal(history(compact, player_num), history(book, player_num), check_dtype=False)
@@ -0,0 +1,31 @@
+from datetime import date, datetime, timezone
+
+from tenhoulog.dedup import Deduplicator, merge_results
+from tenhoulog.models import GameResult, ResultBook
+
+LOG = """L1000 | 00:30 | 四般南喰赤－ | A(+45.0) B(+9.0) C(-20.0) D(-34.0)
+L1000 | 00:50 | 三般南喰赤祝 | A(+64.0,+3枚) B(-8.0,-1枚) C(-56.0,-2枚)
+"""
+
+
+def test_merge_results():
+    text = GameResult.parse_str(LOG.strip(), date(2020, 1, 2))
+    # APIの結果は秒まであるUTCの時刻
+    api = [text[0].copy(update={"starttime": datetime(2020, 1, 1, 15, 30, 12, tzinfo=timezone.utc)})]
+    games, dropped = merge_results({"api": api, "log": text, "again": text})
+    assert len(games) == 2
+    assert dropped == {"api": 0, "log": 1, "again": 2}
+    assert str(games["starttime"].dt.tz) == "UTC+09:00"
+    book = ResultBook.from_results(games, ["A", "B"])
+    assert book.aggregate(4)["回数"].tolist() == [2, 2]
+
+
+def test_deduplicator_streaming(game_results_4):
+    deduplicator = Deduplicator()
+    assert len(deduplicator.add(game_results_4[:3], "a")) == 3
+    # 順位の同じ試合でも得点が異なれば別の試合
+    other = game_results_4[0].copy(update={"player1ptr": 99.0})
+    assert len(deduplicator.add(game_results_4 + [other], "b")) == 2
+    assert len(deduplicator) == 5
+    report = deduplicator.report()
+    assert report.to_dict("list") == {"取得元": ["a", "b"], "試合数": [3, 2], "重複": [0, 3]}
@@ -0,0 +1,30 @@
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ["pandas", "numpy", "matplotlib", "japanize_matplotlib"]
+
+
+def loaded_modules(code: str) -> list:
+    """新しいプロセスでcodeを実行した後に読み込まれている重いモジュール"""
+    script = f"import sys\n{code}\nprint(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True).stdout
+    return [m for m in output.strip().split(",") if m]
+
+
+def test_import_does_not_load_heavy_modules():
+    assert loaded_modules("import tenhoulog\nfrom tenhoulog import GameResult, fetch_player_log") == []
+
+
+def test_result_book_does_not_load_matplotlib():
+    assert loaded_modules("from tenhoulog import ResultBook") == ["pandas", "numpy"]
+    assert loaded_modules("from tenhoulog.models import ResultBook") == ["pandas", "numpy"]
+
+
+def test_models_reexports_only_result_book():
+    from tenhoulog import models
+
+    assert models.ResultBook.__name__ == "ResultBook"
+    with pytest.raises(AttributeError):
+        models.long_frame
@@ -0,0 +1,32 @@
+import pandas as pd
+
+from tenhoulog.index import GameIndex
+from tenhoulog.models import ResultBook
+
+
+def test_game_index_queries(game_results_3):
+    index = GameIndex.from_results(game_results_3)
+    assert index.games("黒服B").tolist() == [1, 2, 3]
+    assert index.count("市川") == 0
+    assert index.union(["アカギ", "ワシズ"]).tolist() == [0, 1, 2]
+    assert index.intersection(["黒服B", "黒服C"]).tolist() == [2, 3]
+    assert index.cooccurrence("アカギ", "黒服C").tolist() == []
+    assert index.intersection([]).tolist() == []
+
+
+def test_game_index_select(game_results_4):
+    index = GameIndex.from_results(game_results_4)
+    selected = index.select(index.games("黒服C"))
+    assert selected["game_id"].tolist() == [2, 2, 2, 2, 3, 3, 3, 3]
+    assert selected["rank"].tolist() == [1, 2, 3, 4, 1, 2, 3, 4]
+
+
+def test_game_index_book(game_results_3, game_results_4, player_names):
+    results = game_results_3 + game_results_4
+    index = GameIndex.from_results(results)
+    for group in [["アカギ"], ["黒服C", "黒服D"], player_names]:
+        expected = ResultBook.from_results(results, group)
+        book = index.book(group)
+        for attr in ["scores", "ranks", "tips"]:
+            pd.testing.assert_frame_equal(getattr(expected, attr), getattr(book, attr), check_dtype=False)
+        pd.testing.assert_frame_equal(expected.aggregate(4), index.compact_book(group).aggregate(4))
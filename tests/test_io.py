@@ -0,0 +1,131 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from tenhoulog import io
+
+
+def api_response(name: str) -> str:
+    return json.dumps(
+        {
+            "earliest": "1978-11-22T00:00:00Z",
+            "lobby": None,
+            "list": [
+                {
+                    "lobby": None,
+                    "playernum": 3,
+                    "player1": name,
+                    "player1ptr": 45.6,
+                    "player1shuugi": None,
+                    "player2": "黒服B",
+                    "player2ptr": 0.0,
+                    "player2shuugi": None,
+                    "player3": "黒服C",
+                    "player3ptr": -45.6,
+                    "player3shuugi": None,
+                    "starttime": "1978-11-22T00:00:00Z",
+                }
+            ],
+        }
+    )
+
+
+def make_client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_fetch_many_players():
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert str(request.url) == io.PLAYER_API_URL
+        name = parse_qs(request.content.decode())["name"][0]
+        requested.append(name)
+        return httpx.Response(200, text=api_response(name))
+
+    async def run():
+        async with make_client(handler) as client:
+            return await io.fetch_many_players(["アカギ", "ワシズ", "アカギ"], client=client, max_concurrency=2)
+
+    results = asyncio.run(run())
+    assert sorted(requested) == ["アカギ", "ワシズ"]
+    assert list(results) == ["アカギ", "ワシズ"]
+    assert results["ワシズ"][0].player1 == "ワシズ"
+
+
+def test_fetch_many_lobbies_retry():
+    calls = {"n": 0}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert str(request.url) == io.LOBBY_API_URL
+        calls["n"] += 1
+        if calls["n"] < 3:
+            return httpx.Response(503)
+        return httpx.Response(200, text=api_response("アカギ"))
+
+    async def run():
+        async with make_client(handler) as client:
+            return await io.fetch_many_lobbies(["C1111"], client=client, backoff=0)
+
+    results = asyncio.run(run())
+    assert calls["n"] == 3
+    assert results["C1111"][0].player1 == "アカギ"
+
+
+def test_fetch_many_lobbies_gives_up():
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("connection refused", request=request)
+
+    async def run():
+        async with make_client(handler) as client:
+            return await io.fetch_many_lobbies(["C1111"], client=client, retries=1, backoff=0)
+
+    with pytest.raises(io.FetchManyError) as excinfo:
+        asyncio.run(run())
+    assert excinfo.value.results == {}
+    assert isinstance(excinfo.value.errors["C1111"], httpx.ConnectError)
+
+
+def test_fetch_many_players_partial_failure():
+    def handler(request: httpx.Request) -> httpx.Response:
+        name = parse_qs(request.content.decode())["name"][0]
+        if name == "ワシズ":
+            return httpx.Response(404)
+        return httpx.Response(200, text=api_response(name))
+
+    async def run():
+        async with make_client(handler) as client:
+            return await io.fetch_many_players(["アカギ", "ワシズ", "市川"], client=client, backoff=0)
+
+    with pytest.raises(io.FetchManyError) as excinfo:
+        asyncio.run(run())
+    assert list(excinfo.value.results) == ["アカギ", "市川"]
+    assert isinstance(excinfo.value.errors["ワシズ"], httpx.HTTPStatusError)
+
+
+def test_fetch_many_lobbies_retry_after(monkeypatch):
+    calls = {"n": 0}
+    sleeps = []
+
+    async def sleep(delay):
+        sleeps.append(delay)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls["n"] += 1
+        if calls["n"] == 1:
+            return httpx.Response(429, headers={"Retry-After": "7"})
+        if calls["n"] == 2:
+            return httpx.Response(429)
+        return httpx.Response(200, text=api_response("アカギ"))
+
+    async def run():
+        async with make_client(handler) as client:
+            return await io.fetch_many_lobbies(["C1111"], client=client, backoff=0.5)
+
+    monkeypatch.setattr(io.asyncio, "sleep", sleep)
+    results = asyncio.run(run())
+    assert sleeps == [7.0, 1.0]
+    assert results["C1111"][0].player1 == "アカギ"
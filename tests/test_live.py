@@ -0,0 +1,46 @@
+from datetime import timezone
+
+import pandas as pd
+import pytest
+
+from tenhoulog.live import LiveResultBook
+from tenhoulog.models import ResultBook
+
+
+def test_live_aggregate(game_results_3, game_results_4, player_names):
+    book = LiveResultBook(capacity=1)
+    for result in game_results_3 + game_results_4:
+        book.append_results([result])
+    assert book.n_games == 8
+    assert len(book) == 28
+    expected = ResultBook.from_results(game_results_3 + game_results_4, player_names).aggregate(4, extra=True)
+    pd.testing.assert_frame_equal(expected, book.aggregate(4, extra=True, player_names=player_names))
+
+
+def test_live_aggregate_unknown_player(game_results_3):
+    book = LiveResultBook()
+    book.append_results(game_results_3)
+    df = book.aggregate(3, player_names=["アカギ", "市川"]).set_index("名前")
+    assert df.loc["アカギ", "順位分布"] == "2-0-0"
+    assert df.loc["市川", "回数"] == 0
+
+
+def test_live_to_book(game_results_4, player_names):
+    results = [r.copy(update={"starttime": r.starttime.replace(tzinfo=timezone.utc)}) for r in game_results_4]
+    book = LiveResultBook()
+    book.append_results(results[:1])
+    book.append_results(results[1:])
+    expected = ResultBook.from_results(results, player_names)
+    actual = book.to_book(player_names)
+    for attr in ["scores", "ranks", "tips"]:
+        pd.testing.assert_frame_equal(getattr(expected, attr), getattr(actual, attr), check_dtype=False)
+    pd.testing.assert_frame_equal(expected.aggregate(4), book.to_compact(player_names).aggregate(4))
+
+
+def test_live_tz_mismatch(game_results_4):
+    aware = [r.copy(update={"starttime": r.starttime.replace(tzinfo=timezone.utc)}) for r in game_results_4]
+    book = LiveResultBook()
+    book.append_results(game_results_4[:1])
+    with pytest.raises(ValueError):
+        book.append_results(aware[1:])
+    assert (book.n_games, len(book), len(book.player_names)) == (1, 4, 4)
@@ -0,0 +1,71 @@
+import asyncio
+import json
+import tracemalloc
+
+import httpx
+import pytest
+
+from tenhoulog import io, metrics
+from tenhoulog.models import ResultBook
+
+GAME = {
+    "playernum": 3,
+    "player1": "A",
+    "player1ptr": 45.6,
+    "player2": "B",
+    "player2ptr": 0.0,
+    "player3": "C",
+    "player3ptr": -45.6,
+    "starttime": "1978-11-22T00:00:00Z",
+}
+TEXT = json.dumps({"earliest": None, "lobby": None, "list": [GAME]})
+
+
+def test_stage_disabled():
+    assert metrics.stage("a") is metrics.stage("b")
+
+
+def test_collector(game_results_4, player_names):
+    with metrics.Collector(memory=True) as collector:
+        ResultBook.from_results(game_results_4, player_names).aggregate(4)
+    assert metrics.stage("a") is metrics.stage("b")
+    assert [(r.stage, r.rows) for r in collector.records] == [("from_results", 4), ("aggregate", 4)]
+    if hasattr(tracemalloc, "reset_peak"):
+        assert all(r.peak_bytes for r in collector.records)
+
+    [line, _] = collector.to_json_lines().splitlines()
+    assert json.loads(line)["stage"] == "from_results"
+    prometheus = collector.to_prometheus()
+    assert 'tenhoulog_stage_calls_total{stage="aggregate"} 1' in prometheus
+    assert 'tenhoulog_stage_rows_total{stage="from_results"} 4' in prometheus
+
+
+@pytest.mark.skipif(not hasattr(tracemalloc, "reset_peak"), reason="requires tracemalloc.reset_peak")
+def test_stage_peak_memory():
+    with metrics.Collector(memory=True) as collector:
+        before = bytearray(10_000_000)
+        with metrics.stage("single"):
+            buffer = bytearray(1_000_000)
+        with metrics.stage("outer"):
+            with metrics.stage("inner"):
+                buffer = bytearray(1_000_000)
+        del before, buffer
+    [single, inner, outer] = collector.records
+    # 開始前に確保したメモリは含まない
+    assert 1_000_000 <= single.peak_bytes < 2_000_000
+    # 他の段階と重なった段階のピークは区別できないので測らない
+    assert inner.peak_bytes is None and outer.peak_bytes is None
+
+
+def test_collector_fetch():
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, text=TEXT))
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await io.fetch_many_players(["アカギ"], client=client)
+
+    with metrics.Collector() as collector:
+        asyncio.run(run())
+    [fetch, parse] = collector.records
+    assert (fetch.stage, fetch.nbytes, fetch.labels) == ("fetch", len(TEXT.encode()), {"url": io.PLAYER_API_URL})
+    assert (parse.stage, parse.rows, parse.peak_bytes) == ("parse_raw", 1, None)
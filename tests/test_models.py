@@ -4,189 +4,10 @@ import pytest
 import pandas as pd
 
 from tenhoulog import models
-from tenhoulog.models import GameResult
 
 JST = timezone(timedelta(hours=+9), "JST")
 
 
-@pytest.fixture
-def player_names():
-    return [
-        "アカギ",
-        "ワシズ",
-        "黒服A",
-        "黒服B",
-        "黒服C",
-        "黒服D",
-    ]
-
-
-@pytest.fixture
-def game_results_3():
-    """
-    +--------+--------+-------+--------+--------+--------+
-    | アカギ  | ワシズ  | 黒服A  | 黒服B  |  黒服C  | 黒服D   |
-    +--------+--------+-------+--------+--------+--------+
-    | 100.0  | -88.2  | -11.8 |  nan   |  nan   |  nan   |
-    +--------+--------+-------+--------+--------+--------+
-    | 290.4  |  nan   |  nan  | -160.4 |  nan   | -130.0 |
-    +--------+--------+-------+--------+--------+--------+
-    |  nan   | 380.0  |  nan  | -220.0 | -160.0 |  nan   |
-    +--------+--------+-------+--------+--------+--------+
-    |  nan   |  nan   | 45.6  |  0.0   | -45.6  |  nan   |
-    +--------+--------+-------+--------+--------+--------+
-
-    """
-    fields = [
-        {
-            "lobby": "1111",
-            "playernum": 3,
-            "player1": "アカギ",
-            "player1ptr": 100.0,
-            "player1shuugi": 10,
-            "player2": "黒服A",
-            "player2ptr": -11.8,
-            "player2shuugi": -2,
-            "player3": "ワシズ",
-            "player3ptr": -88.2,
-            "player3shuugi": -8,
-            "starttime": datetime(1978, 11, 22),
-        },
-        {
-            "lobby": "1111",
-            "playernum": 3,
-            "player1": "アカギ",
-            "player1ptr": 290.4,
-            "player1shuugi": None,
-            "player2": "黒服D",
-            "player2ptr": -130.0,
-            "player2shuugi": None,
-            "player3": "黒服B",
-            "player3ptr": -160.4,
-            "player3shuugi": None,
-            "starttime": datetime(1978, 11, 23),
-        },
-        {
-            "lobby": "1111",
-            "playernum": 3,
-            "player1": "ワシズ",
-            "player1ptr": 380,
-            "player1shuugi": 140,
-            "player2": "黒服C",
-            "player2ptr": -160,
-            "player2shuugi": -70,
-            "player3": "黒服B",
-            "player3ptr": -220,
-            "player3shuugi": -70,
-            "starttime": datetime(1978, 11, 23),
-        },
-        {
-            "lobby": "1111",
-            "playernum": 3,
-            "player1": "黒服A",
-            "player1ptr": 45.6,
-            "player1shuugi": None,
-            "player2": "黒服B",
-            "player2ptr": 0,
-            "player2shuugi": None,
-            "player3": "黒服C",
-            "player3ptr": -45.6,
-            "player3shuugi": None,
-            "starttime": datetime(1978, 11, 24),
-        },
-    ]
-    return [GameResult(**field) for field in fields]
-
-
-@pytest.fixture
-def game_results_4():
-    """
-    +--------+--------+-------+--------+--------+--------+
-    | アカギ  | ワシズ  | 黒服A  | 黒服B  |  黒服C  | 黒服D   |
-    +--------+--------+-------+--------+--------+--------+
-    | 100.0  | -88.2  | -8.3  |  3.5   |  nan   |  nan   |
-    +--------+--------+-------+--------+--------+--------+
-    | 290.4  |  nan   |  0.0  | -160.4 |  nan   | -130.0 |
-    +--------+--------+-------+--------+--------+--------+
-    |  nan   | 380.0  |  -50  | -220.0 | -110.0 |  nan   |
-    +--------+--------+-------+--------+--------+--------+
-    |  nan   |  nan   | 55.6  |  0.0   | -45.6  |  -10   |
-    +--------+--------+-------+--------+--------+--------+
-
-    """
-    fields = [
-        {
-            "lobby": "1111",
-            "playernum": 4,
-            "player1": "アカギ",
-            "player1ptr": 100.0,
-            "player1shuugi": 10,
-            "player2": "黒服B",
-            "player2ptr": 3.5,
-            "player2shuugi": 0,
-            "player3": "黒服A",
-            "player3ptr": -8.3,
-            "player3shuugi": -2,
-            "player4": "ワシズ",
-            "player4ptr": -88.2,
-            "player4shuugi": -8,
-            "starttime": datetime(1978, 11, 22),
-        },
-        {
-            "lobby": "1111",
-            "playernum": 4,
-            "player1": "アカギ",
-            "player1ptr": 290.4,
-            "player1shuugi": None,
-            "player2": "黒服A",
-            "player2ptr": 0,
-            "player2shuugi": None,
-            "player3": "黒服D",
-            "player3ptr": -130.0,
-            "player3shuugi": None,
-            "player4": "黒服B",
-            "player4ptr": -160.4,
-            "player4shuugi": None,
-            "starttime": datetime(1978, 11, 23),
-        },
-        {
-            "lobby": "1111",
-            "playernum": 4,
-            "player1": "ワシズ",
-            "player1ptr": 380,
-            "player1shuugi": 140,
-            "player2": "黒服A",
-            "player2ptr": -50,
-            "player2shuugi": -20,
-            "player3": "黒服C",
-            "player3ptr": -110,
-            "player3shuugi": -50,
-            "player4": "黒服B",
-            "player4ptr": -220,
-            "player4shuugi": -70,
-            "starttime": datetime(1978, 11, 23),
-        },
-        {
-            "lobby": "1111",
-            "playernum": 4,
-            "player1": "黒服A",
-            "player1ptr": 55.6,
-            "player1shuugi": None,
-            "player2": "黒服B",
-            "player2ptr": 0,
-            "player2shuugi": None,
-            "player3": "黒服D",
-            "player3ptr": -10.0,
-            "player3shuugi": None,
-            "player4": "黒服C",
-            "player4ptr": -45.6,
-            "player4shuugi": None,
-            "starttime": datetime(1978, 11, 24),
-        },
-    ]
-    return [GameResult(**field) for field in fields]
-
-
 def test_game_result_to_records_3(game_results_3):
     for result in game_results_3:
         records = result.to_records()
@@ -300,3 +121,143 @@ def test_parse_record_str(record_str, name, point, tip):
 )
 def test_from_str(records_str, records):
     assert models.Record.parse_str(records_str) == records
+
+
+def test_api_response_parse_columns(game_results_4):
+    text = models.APIResponse(earliest=None, lobby="1111", list=game_results_4).json()
+    df = models.APIResponse.parse_columns(text)
+    assert len(df) == 4
+    assert list(df["player1"]) == ["アカギ", "アカギ", "ワシズ", "黒服A"]
+    assert list(df["player2ptr"]) == [3.5, 0.0, -50.0, 0.0]
+    assert df["player1shuugi"].isnull().tolist() == [False, True, False, True]
+    assert df["starttime"].dt.tz is not None
+    pd.testing.assert_frame_equal(df, models.APIResponse.parse_columns(text, validate=True), check_dtype=False)
+
+
+def test_api_response_parse_columns_unixtime():
+    text = (
+        '{"earliest": null, "lobby": null, "list": [{"lobby": null, "playernum": "3",'
+        ' "player1": "A", "player1ptr": "45.6", "player2": "B", "player2ptr": "0",'
+        ' "player3": "C", "player3ptr": "-45.6", "starttime": "1245181560"}]}'
+    )
+    df = models.APIResponse.parse_columns(text)
+    expected = models.APIResponse.parse_raw(text).list[0]
+    assert df["starttime"][0] == expected.starttime
+    assert df["player1ptr"][0] == expected.player1ptr
+    assert df["playernum"][0] == 3
+
+
+def test_book_from_results_4(game_results_4, player_names):
+    book = models.ResultBook.from_results(game_results_4, ["黒服D", "アカギ"])
+    ranks = pd.DataFrame(
+        [
+            [None, 1, datetime(1978, 11, 22)],
+            [3, 1, datetime(1978, 11, 23)],
+            [3, None, datetime(1978, 11, 24)],
+        ],
+        columns=["黒服D", "アカギ", "starttime"],
+    )
+    pd.testing.assert_frame_equal(ranks, book.ranks, check_dtype=False)
+    assert book.tips["アカギ"].tolist()[0] == 10
+
+
+def test_book_from_results_frame(game_results_4, player_names):
+    text = models.APIResponse(earliest=None, lobby="1111", list=game_results_4).json()
+    book = models.ResultBook.from_results(models.APIResponse.parse_columns(text), player_names)
+    expected = models.ResultBook.from_results(game_results_4, player_names)
+    pd.testing.assert_frame_equal(expected.scores.drop(columns="starttime"), book.scores.drop(columns="starttime"))
+    assert book.scores["starttime"].dt.tz is not None
+
+
+def test_book_from_results_duplicated_name(game_results_4):
+    result = game_results_4[0].copy(update={"player2": "NoName", "player3": "NoName"})
+    book = models.ResultBook.from_results([result], ["NoName"])
+    assert book.scores["NoName"].tolist() == [-8.3]
+
+
+def test_book_aggregate(game_results_4, player_names):
+    book = models.ResultBook.from_results(game_results_4, player_names)
+    expected = pd.DataFrame(
+        [
+            ["アカギ", 2, 390.4, "2-0-0-0", 1.0, 10],
+            ["ワシズ", 2, 291.8, "1-0-0-1", 2.5, 132],
+            ["黒服A", 4, -2.7, "1-2-1-0", 2.0, -22],
+            ["黒服B", 4, -376.9, "0-2-0-2", 3.0, -70],
+            ["黒服C", 2, -155.6, "0-0-1-1", 3.5, -50],
+            ["黒服D", 2, -140.0, "0-0-2-0", 3.0, 0],
+        ],
+        columns=["名前", "回数", "得点", "順位分布", "平均順位", "祝儀"],
+    )
+    pd.testing.assert_frame_equal(expected, book.aggregate(4), check_dtype=False)
+
+
+def test_book_aggregate_extra(game_results_4, player_names):
+    df = models.ResultBook.from_results(game_results_4, player_names).aggregate(4, extra=True).set_index("名前")
+    assert df.loc["アカギ", "トップ率"] == 1.0
+    assert df.loc["黒服B", "ラス回避率"] == 0.5
+    assert df.loc["ワシズ", "平均得点"] == pytest.approx(145.9)
+
+
+def test_book_sorted_by_starttime(game_results_4, player_names):
+    book = models.ResultBook.from_results(list(reversed(game_results_4)), player_names)
+    assert book.scores["starttime"].is_monotonic_increasing
+    assert book.scores["アカギ"].dropna().tolist() == [100.0, 290.4]
+    added = models.ResultBook.from_results(game_results_4[2:], player_names) + models.ResultBook.from_results(
+        game_results_4[:2], player_names
+    )
+    assert added.scores["starttime"].is_monotonic_increasing
+    assert added.ranks["ワシズ"].tolist()[0] == 4
+
+
+@pytest.mark.parametrize(
+    "time_period",
+    [
+        (datetime(1978, 11, 23), datetime(1978, 11, 24)),
+        (datetime(1978, 11, 22, 12), datetime(1978, 11, 25)),
+        (datetime(1978, 1, 1), datetime(1978, 2, 1)),
+    ],
+)
+def test_book_filter_by_period(game_results_4, player_names, time_period):
+    book = models.ResultBook.from_results(game_results_4, player_names)
+    expected = book._filter_df_by_period(book.scores, time_period)
+    pd.testing.assert_frame_equal(expected, book.filter_by_period(time_period).scores)
+    [actual] = book.filter_by_periods([time_period])
+    pd.testing.assert_frame_equal(expected, actual.scores)
+
+
+def test_book_filter_by_period_after_reassign(game_results_4, player_names):
+    book = models.ResultBook.from_results(game_results_4, player_names)
+    period = (datetime(1978, 11, 23), datetime(1978, 11, 24))
+    book.filter_by_period(period)
+    fresh = models.ResultBook.from_results(game_results_4[2:], player_names)
+    book.scores, book.ranks, book.tips = fresh.scores, fresh.ranks, fresh.tips
+    pd.testing.assert_frame_equal(fresh.filter_by_period(period).scores, book.filter_by_period(period).scores)
+
+
+def test_book_filter_by_periods_tz(game_results_4, player_names):
+    results = [r.copy(update={"starttime": r.starttime.replace(tzinfo=timezone.utc)}) for r in game_results_4]
+    book = models.ResultBook.from_results(results, player_names)
+    periods = [
+        (datetime(1978, 11, 23, 9, tzinfo=JST), datetime(1978, 11, 24, 9, tzinfo=JST)),
+        (datetime(1978, 11, 22, tzinfo=timezone.utc), datetime(1978, 11, 23, tzinfo=timezone.utc)),
+    ]
+    assert [len(b.scores) for b in book.filter_by_periods(periods)] == [2, 1]
+
+
+def test_book_plot_cumsum(game_results_3, player_names):
+    fig = models.ResultBook.from_results(game_results_3, player_names).plot_cumsum()
+    [ax] = fig.axes
+    assert len(ax.get_lines()) == len(player_names)
+    assert list(ax.get_lines()[0].get_ydata()[:2]) == [100.0, 390.4]
+
+
+def test_book_plot_cumsum_fast(game_results_4, player_names, tmp_path):
+    book = models.ResultBook.from_results(game_results_4, player_names)
+    fig = book.plot_cumsum(fast=True, top_n=2, highlight=["黒服A"], path=tmp_path / "cumsum.png")
+    [ax] = fig.axes
+    [collection] = ax.collections
+    [akagi, washizu, a] = [segment[:, 1].tolist() for segment in collection.get_segments()]
+    assert (akagi, washizu) == ([100.0, 390.4], [-88.2, 291.8])
+    assert a == pytest.approx([-8.3, -8.3, -58.3, -2.7])
+    assert [text.get_text() for text in ax.get_legend().get_texts()] == ["黒服A"]
+    assert (tmp_path / "cumsum.png").exists()
@@ -0,0 +1,20 @@
+import numpy as np
+
+from tenhoulog.plotting import lttb
+
+
+def test_lttb():
+    y = np.column_stack([np.sin(np.arange(1000) / 50), np.arange(1000.0)])
+    y[600:, 1] = np.nan
+    rows = lttb(y, 100)
+    assert rows.shape == (100, 2)
+    assert (rows[0] == 0).all() and (rows[-1] == 999).all()
+    assert (np.diff(rows, axis=0) > 0).all()
+    # 山と谷の頂点が残る
+    assert np.abs(y[rows[:, 0], 0]).max() > 0.999
+    assert np.isnan(y[rows[:, 1], 1]).sum() < 45
+
+
+def test_lttb_short():
+    y = np.arange(10.0)[:, None]
+    assert lttb(y, 100)[:, 0].tolist() == list(range(10))
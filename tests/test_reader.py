@@ -0,0 +1,69 @@
+import gzip
+import io
+from datetime import date, datetime
+
+import pandas as pd
+
+from tenhoulog import reader
+from tenhoulog.models import GameResult, ResultBook
+
+LOG = """L1000 | 00:30 | 四般南喰赤－ | A(+45.0) B(+9.0) C(-20.0) D(-34.0)
+L1000 | 00:40 | 四般南喰赤－ | broken line
+L1000 | 00:45 | 四般南喰赤－ | A(+45.0) B(+9.0)
+C1000 | 00:50 | 三般南喰赤祝 | A(+64.0,+3枚) B(-8.0,-1枚) C(-56.0,-2枚)<br>
+
+L1000 | 01:30 | 四般南喰赤－ | D(+85.0) B(+1.0) C(-10.0) E(-74.0)
+"""
+
+
+def test_iter_batches_reports_malformed_lines():
+    errors = []
+    batches = list(reader.iter_batches(io.StringIO(LOG), date(2020, 1, 1), batch_size=2, errors=errors))
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert batches[0][1] == GameResult.from_str(LOG.splitlines()[3][:-4], date(2020, 1, 1))
+    assert batches[1][0].starttime == datetime(2020, 1, 1, 1, 30)
+    assert [(e.lineno, e.line) for e in errors] == [(2, LOG.splitlines()[1]), (3, LOG.splitlines()[2])]
+
+
+def test_iter_batches_gzip(tmp_path):
+    path = tmp_path / "scc20200101.html.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(LOG)
+    errors = []
+    frames = list(reader.iter_batches(path, date(2020, 1, 1), as_frame=True, errors=errors))
+    assert len(frames) == 1
+    assert [e.lineno for e in errors] == [2, 3]
+    assert list(frames[0]["player1"]) == ["A", "A", "D"]
+
+
+def test_read_book():
+    lines = LOG.splitlines()
+    results = GameResult.parse_str("\n".join([lines[0], lines[3][:-4], lines[5]]), date(2020, 1, 1))
+    expected = ResultBook.from_results(results, ["A", "B", "E"])
+    source = io.BytesIO(LOG.encode())
+    book = reader.read_book(source, date(2020, 1, 1), ["A", "B", "E"], batch_size=1, errors=[])
+    assert not source.closed
+    for attr in ["scores", "ranks", "tips"]:
+        pd.testing.assert_frame_equal(getattr(expected, attr), getattr(book, attr), check_dtype=False)
+
+
+def test_date_from_filename():
+    assert reader.date_from_filename("scc20200815.html.gz") == date(2020, 8, 15)
+    assert reader.date_from_filename("/logs/2020/sca20201301.log") is None
+    assert reader.date_from_filename("README.md") is None
+
+
+def test_read_log_dir(tmp_path):
+    (tmp_path / "scc20200102.log").write_text(LOG, encoding="utf-8")
+    with gzip.open(tmp_path / "scc20200101.html.gz", "wt", encoding="utf-8") as f:
+        f.write(LOG)
+    (tmp_path / "README.md").write_text("not a log", encoding="utf-8")
+    errors = []
+    builder = reader.read_log_dir(tmp_path, ["A", "E"], processes=2, errors=errors)
+    book = builder.build()
+    assert builder.n_games == 6
+    assert [t.day for t in book.scores["starttime"]] == [1, 1, 1, 2, 2, 2]
+    paths = [str(tmp_path / "scc20200101.html.gz"), str(tmp_path / "scc20200102.log")]
+    assert [e.path for e in errors] == [paths[0], paths[0], paths[1], paths[1]]
+    serial = reader.read_log_dir(tmp_path, ["A", "E"], processes=1, errors=[]).build()
+    pd.testing.assert_frame_equal(book.scores, serial.scores)
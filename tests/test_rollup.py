@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+from tenhoulog.models import ResultBook
+from tenhoulog.rollup import DailyRollup
+
+JST = timezone(timedelta(hours=9))
+PERIODS = [
+    (datetime(1978, 11, 22), datetime(1978, 11, 25)),
+    (datetime(1978, 11, 23), datetime(1978, 11, 24)),
+    (datetime(1978, 11, 24), datetime(1978, 12, 1)),
+    (datetime(1978, 11, 1), datetime(1978, 11, 2)),
+]
+
+
+@pytest.mark.parametrize("period", PERIODS)
+def test_rollup_aggregate(game_results_4, player_names, period):
+    book = ResultBook.from_results(game_results_4, player_names)
+    expected = book.filter_by_period(period).aggregate(4, extra=True)
+    pd.testing.assert_frame_equal(book.rollup().aggregate(4, period, extra=True), expected)
+
+
+def test_rollup_incremental(game_results_4):
+    # nodocchi.moeのAPIと同じくUTCの時刻
+    results = [
+        r.copy(update={"starttime": r.starttime.replace(tzinfo=JST).astimezone(timezone.utc)}) for r in game_results_4
+    ]
+    rollup = DailyRollup()
+    rollup.add_results(results[2:])
+    rollup.add_results(results[:2])
+    assert list(rollup.days.astype(str)) == ["1978-11-22", "1978-11-23", "1978-11-24"]
+    book = ResultBook.from_results(results, rollup.players)
+    period = (datetime(1978, 11, 22, tzinfo=JST), datetime(1978, 11, 24, tzinfo=JST))
+    pd.testing.assert_frame_equal(rollup.aggregate(4, period), book.filter_by_period(period).aggregate(4))
+    # 日の区切りはJSTの0時
+    with pytest.raises(ValueError):
+        rollup.aggregate(4, (datetime(1978, 11, 22, tzinfo=timezone.utc), period[1]))
+    # タイムゾーンの無い時刻はJSTとみなす
+    naive = (datetime(1978, 11, 22), datetime(1978, 11, 24))
+    pd.testing.assert_frame_equal(rollup.aggregate(4, naive), rollup.aggregate(4, period))
+
+
+def test_rollup_tz(game_results_4, player_names):
+    results = [r.copy(update={"starttime": r.starttime.replace(tzinfo=timezone.utc)}) for r in game_results_4]
+    book = ResultBook.from_results(results, player_names)
+    period = (datetime(1978, 11, 23, tzinfo=timezone.utc), datetime(1978, 11, 24, tzinfo=timezone.utc))
+    expected = book.filter_by_period(period).aggregate(4)
+    pd.testing.assert_frame_equal(book.rollup(tz=timezone.utc).aggregate(4, period), expected)
+
+
+def test_rollup_player_names(game_results_3, player_names):
+    rollup = DailyRollup.from_long(ResultBook.from_results(game_results_3, player_names).to_long(), ["アカギ"])
+    df = rollup.aggregate(3, player_names=["アカギ", "鷲巣"])
+    assert df["名前"].tolist() == ["アカギ", "鷲巣"]
+    assert df["回数"].tolist() == [2, 0]
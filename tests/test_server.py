@@ -0,0 +1,58 @@
+import asyncio
+
+import httpx
+
+from tenhoulog.cli import PLAYER_API_PATH, LOBBY_API_PATH
+from tenhoulog.models import APIResponse
+from tenhoulog.server import BookServer, BookSource, StubAPI, start_http
+
+
+def write_api(directory, kind, key, results):
+    (directory / kind).mkdir(exist_ok=True)
+    (directory / kind / f"{key}.json").write_text(APIResponse(earliest=None, lobby=None, list=results).json())
+
+
+def test_book_server(tmp_path, game_results_3, game_results_4):
+    write_api(tmp_path, "lobby", "L1111", game_results_4)
+    write_api(tmp_path, "player", "アカギ", game_results_3)
+    write_api(tmp_path, "player", "ワシズ", game_results_3[:2])
+
+    async def run():
+        stub = await start_http(StubAPI(tmp_path).handle, "127.0.0.1", 0)
+        base = f"http://127.0.0.1:{stub.sockets[0].getsockname()[1]}"
+        sources = [BookSource("L1111", "lobby", ["L1111"]), BookSource("akagi", "players", ["アカギ", "ワシズ"])]
+        book_server = BookServer(sources, lobby_url=base + LOBBY_API_PATH, player_url=base + PLAYER_API_PATH)
+        server = await book_server.start("127.0.0.1", 0)
+        url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+        async with httpx.AsyncClient(base_url=url) as client:
+            books = (await client.get("/books")).json()
+            assert [(book["name"], book["games"]) for book in books] == [("L1111", 4), ("akagi", 3)]
+
+            params = {"book": "akagi", "player_num": "3", "end": "1978-11-23T00:00:00"}
+            first = await client.get("/aggregate", params=params)
+            assert [(row["名前"], row["回数"]) for row in first.json()] == [("アカギ", 1), ("ワシズ", 1)]
+            assert (await client.get("/aggregate", params=params)).content == first.content
+            assert book_server.cache_hits == 1
+            # 片方の端点だけの期間や範囲外の端点はpd.Timestampで表せる範囲に収める
+            for params in ({"start": "1978-11-23T00:00:00"}, {"start": "0001-01-01", "end": "9999-12-31"}):
+                response = await client.get("/aggregate", params={"book": "akagi", "player_num": "3", **params})
+                assert response.status_code == 200
+
+            plot = await client.get("/plot", params={"book": "L1111", "top_n": "2"})
+            assert plot.headers["content-type"] == "image/png"
+            assert (await client.get("/aggregate", params={"book": "none"})).status_code == 404
+            assert (await client.get("/aggregate", params={"book": "L1111", "player_num": "x"})).status_code == 400
+
+            # 取得し直すとキャッシュが破棄される
+            lobby = (await client.get("/aggregate", params={"book": "L1111"})).json()
+            assert sum(row["回数"] for row in lobby) == 16
+            write_api(tmp_path, "lobby", "L1111", game_results_4[:1])
+            assert (await client.post("/refresh", params={"book": "L1111"})).status_code == 200
+            lobby = (await client.get("/aggregate", params={"book": "L1111"})).json()
+            assert sum(row["回数"] for row in lobby) == 4
+        book_server.stop()
+        for s in (server, stub):
+            s.close()
+            await s.wait_closed()
+
+    asyncio.run(run())
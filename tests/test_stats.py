@@ -0,0 +1,117 @@
+import pandas as pd
+import pytest
+
+from tenhoulog import stats
+from tenhoulog.compact import CompactResultBook
+from tenhoulog.models import ResultBook
+from tenhoulog.stats import streaks
+
+
+def test_head_to_head(game_results_4, player_names):
+    df = ResultBook.from_results(game_results_4, player_names).head_to_head().set_index(["名前", "相手"])
+    assert len(df) == 26
+    row = df.loc[("黒服A", "黒服B")]
+    assert (row["同卓数"], row["勝ち"], row["負け"]) == (4, 3, 1)
+    assert row["得点差"] == pytest.approx(-8.3 - 3.5 + 160.4 - 50 + 220 + 55.6)
+    assert df.loc[("黒服B", "黒服A"), "勝率"] == 0.25
+    assert ("アカギ", "黒服C") not in df.index
+
+
+def test_head_to_head_top_k(game_results_4, player_names):
+    df = CompactResultBook.from_results(game_results_4, player_names).head_to_head(top_k=2)
+    assert df.groupby("名前").size().max() == 2
+    assert df[df["名前"] == "黒服A"]["相手"].tolist() == ["黒服B", "アカギ"]
+
+
+def test_history(game_results_4, player_names):
+    history = ResultBook.from_results(game_results_4, player_names).history(4, window=2)
+    a = history[history["player"] == "黒服A"]
+    assert a["試合数"].tolist() == [1, 2, 3, 4]
+    assert a["直近平均順位"].tolist() == [3, 2.5, 2, 1.5]
+    assert a["累積得点"].tolist() == pytest.approx([-8.3, -8.3, -58.3, -2.7])
+    b = history[history["player"] == "黒服B"]
+    assert b["直近得点"].tolist() == pytest.approx([3.5, -156.9, -380.4, -220.0])
+    assert b["連続ラス"].tolist() == [0, 1, 2, 0]
+    akagi = history[history["player"] == "アカギ"]
+    assert akagi["レート"].tolist() == pytest.approx([1530, 1530 + 0.998 * (30 - 30 / 40)])
+
+
+def test_history_mixed_player_num(game_results_3, game_results_4, player_names):
+    book = ResultBook.from_results(game_results_3 + game_results_4, player_names)
+    four = ResultBook.from_results(game_results_4, player_names).history(4)
+    pd.testing.assert_frame_equal(
+        book.history(4).drop(columns="game_id"), four.drop(columns="game_id"), check_dtype=False
+    )
+    three = book.history(3)
+    assert three["rank"].max() == 3
+    assert len(three) == len(ResultBook.from_results(game_results_3, player_names).history(3))
+    # 対戦人数が分からない場合は, 人数より下の順位があればエラー
+    with pytest.raises(ValueError):
+        stats.player_history(book.to_long().drop(columns="playernum"), 3)
+
+
+def test_history_dan():
+    long = pd.DataFrame(
+        {
+            "game_id": range(8),
+            "player": "A",
+            "rank": [1, 1, 1, 1, 1, 1, 4, 2],
+            "point": 0.0,
+            "tip": 0.0,
+            "playernum": 4,
+        }
+    )
+    history = stats.player_history(long, 4, dan_points=(30.0, 15.0, 0.0))
+    # 昇級すると0から. 5級まではラスでも減らない
+    assert history["段位"].tolist() == ["9級", "8級", "7級", "6級", "6級", "5級", "5級", "5級"]
+    assert history["段位ポイント"].tolist() == [0, 0, 0, 0, 30, 0, 0, 15]
+
+    # 二段以上は0未満になると降段する
+    ranks = [1] * 16 + [4] * 9
+    long = pd.DataFrame({"game_id": range(25), "player": "A", "rank": ranks, "point": 0.0, "tip": 0.0})
+    history = stats.player_history(long, 4)
+    assert history["段位"].tolist()[11:17] == ["1級", "初段", "初段", "初段", "二段", "二段"]
+    assert history["段位ポイント"].tolist()[15:] == [400, 355, 310, 265, 220, 175, 130, 85, 40, 200]
+    assert history["段位"].iloc[-1] == "初段"
+
+
+def test_plot_cumsum_from_history(game_results_4, player_names):
+    book = ResultBook.from_results(game_results_4, player_names)
+    history = book.history(4)
+    expected = stats.cumulative(book.to_long(), "point", book.players)
+    table = stats.pivot_history(history, "累積得点", book.players)
+    pd.testing.assert_frame_equal(table, expected, check_dtype=False, check_index_type=False)
+    fig = book.plot_cumsum(fast=True, history=history)
+    assert len(fig.axes[0].collections[0].get_segments()) == len(book.players)
+
+
+def test_streaks(game_results_4, player_names):
+    book = CompactResultBook.from_results(game_results_4, player_names)
+    df = streaks(book.history(4)).set_index("名前")
+    assert df.loc["アカギ", "最長連続トップ"] == 2
+    assert df.loc["黒服B", "最長連続ラス"] == 2
+    assert df.loc["黒服A", "最終レート"] == book.history(4).query("player == '黒服A'")["レート"].iloc[-1]
+
+
+def test_bootstrap(game_results_4, player_names):
+    book = ResultBook.from_results(game_results_4, player_names)
+    df = book.bootstrap(200, seed=0).set_index("名前")
+    expected = book.aggregate(4, extra=True).set_index("名前")
+    assert df["回数"].tolist() == expected["回数"].tolist()
+    assert df["平均順位"].tolist() == pytest.approx(expected["平均順位"].tolist())
+    assert df["平均得点"].tolist() == pytest.approx(expected["平均得点"].tolist())
+    assert df["トップ率"].tolist() == pytest.approx(expected["トップ率"].tolist())
+    assert (df["平均順位_下限"] <= df["平均順位"]).all() and (df["平均順位"] <= df["平均順位_上限"]).all()
+    # 区間は抽出元の得点の範囲に収まる
+    assert -130.0 <= df.loc["黒服D", "平均得点_下限"] < df.loc["黒服D", "平均得点_上限"] <= -10.0
+    pd.testing.assert_frame_equal(book.bootstrap(200, seed=0).set_index("名前"), df)
+
+
+def test_bootstrap_processes(monkeypatch, game_results_4, player_names):
+    monkeypatch.setattr(stats, "_BOOTSTRAP_CHUNK", 16)  # 1行あたり1抽出になるよう分割する
+    book = CompactResultBook.from_results(game_results_4, player_names)
+    serial = book.bootstrap(50, stats=["平均順位"], seed=1)
+    pd.testing.assert_frame_equal(book.bootstrap(50, stats=["平均順位"], seed=1, processes=2), serial)
+    assert list(serial.columns) == ["名前", "回数", "平均順位", "平均順位_下限", "平均順位_上限"]
+    with pytest.raises(ValueError):
+        book.bootstrap(10, stats=["連対率"])
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+from tenhoulog import store
+from tenhoulog.compact import CompactResultBook
+from tenhoulog.models import ResultBook
+
+pytest.importorskip("pyarrow")
+
+JST = timezone(timedelta(hours=+9), "JST")
+
+
+@pytest.fixture
+def monthly_results(game_results_4):
+    """game_results_4を1ヶ月ずつずらしたもの"""
+    return [
+        result.copy(update={"starttime": datetime(2020, i + 1, 15, tzinfo=timezone.utc)})
+        for (i, result) in enumerate(game_results_4)
+    ]
+
+
+def test_book_parquet_roundtrip(tmp_path, monthly_results, player_names):
+    book = ResultBook.from_results(monthly_results, player_names)
+    book.to_parquet(tmp_path / "book")
+    assert sorted(p.name for p in (tmp_path / "book").glob("month=*")) == [
+        "month=2020-01",
+        "month=2020-02",
+        "month=2020-03",
+        "month=2020-04",
+    ]
+    loaded = ResultBook.from_parquet(tmp_path / "book")
+    for attr in ["scores", "ranks", "tips"]:
+        pd.testing.assert_frame_equal(getattr(book, attr), getattr(loaded, attr), check_dtype=False)
+
+
+def test_book_parquet_period(tmp_path, monthly_results, player_names, monkeypatch):
+    book = ResultBook.from_results(monthly_results, player_names)
+    book.to_parquet(tmp_path)
+    read = []
+    original = pd.read_parquet
+    monkeypatch.setattr(store.pd, "read_parquet", lambda path: read.append(path.parent.name) or original(path))
+    period = (datetime(2020, 2, 1, tzinfo=JST), datetime(2020, 3, 15, 9, tzinfo=JST))
+    loaded = ResultBook.from_parquet(tmp_path, period)
+    assert read == ["month=2020-01", "month=2020-02", "month=2020-03"]
+    expected = book.filter_by_period(period)
+    for attr in ["scores", "ranks", "tips"]:
+        pd.testing.assert_frame_equal(
+            getattr(expected, attr).reset_index(drop=True), getattr(loaded, attr), check_dtype=False
+        )
+
+
+def test_compact_parquet_roundtrip(tmp_path, monthly_results, player_names):
+    book = CompactResultBook.from_results(monthly_results, player_names)
+    book.to_parquet(tmp_path)
+    loaded = CompactResultBook.from_parquet(tmp_path)
+    pd.testing.assert_frame_equal(book.records, loaded.records, check_dtype=False)
+    pd.testing.assert_frame_equal(book.aggregate(4), loaded.aggregate(4))
+
+
+@pytest.mark.parametrize("tz", [JST, timezone(timedelta(hours=-5))])
+def test_book_parquet_fixed_offset(tmp_path, monthly_results, player_names, tz):
+    results = [result.copy(update={"starttime": result.starttime.astimezone(tz)}) for result in monthly_results]
+    book = ResultBook.from_results(results, player_names)
+    book.to_parquet(tmp_path)
+    period = (datetime(2020, 2, 1, tzinfo=JST), datetime(2020, 3, 16, tzinfo=JST))
+    loaded = ResultBook.from_parquet(tmp_path, period)
+    expected = book.filter_by_period(period)
+    assert len(loaded.scores) == 2
+    for attr in ["scores", "ranks", "tips"]:
+        pd.testing.assert_frame_equal(
+            getattr(expected, attr).reset_index(drop=True), getattr(loaded, attr), check_dtype=False
+        )